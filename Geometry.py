@@ -8,6 +8,386 @@
 
 import numpy as np
 import math
+from collections import OrderedDict
+import os
+import io
+from types import SimpleNamespace, FunctionType
+import warnings
+#fractions (exact mode), and shutil, tempfile, zipfile and hashlib (DiskCache and
+#Export_Metrics) are imported where they are used, so that importing this module for
+#the viewer's first paint does not pay for them.
+#Numba is optional. When it can be imported the fused per-triangle kernels can be JIT
+#compiled (see _Numba_Kernels). It is slow to import, so it is only imported when the
+#'numba' backend is asked for, and that backend is not the default.
+_HAVE_NUMBA = None
+
+
+def _Numba_Available():
+    '''Whether Numba can be imported, found out once by importing it.'''
+
+    global _HAVE_NUMBA
+
+    if _HAVE_NUMBA is None:
+        try:
+            import numba
+            _HAVE_NUMBA = True
+        except Exception:
+            _HAVE_NUMBA = False
+
+    return _HAVE_NUMBA
+
+
+#Unit roundoff of float64. Filtered predicates evaluate in floats first and only
+#fall back to exact arithmetic when the result is within a few ulps of zero.
+_UNIT_ROUNDOFF = 2.0**-53
+
+#Bound on the error of a difference of two squared side lengths computed in floats,
+#relative to the sum of the squared side lengths (a conservative multiple of the
+#roughly 5 roundings involved).
+_SIDE_DIFFERENCE_ERROR = 8*_UNIT_ROUNDOFF
+
+#The triangle centers, and the method generating the construction lines of each
+CENTERS = ['Centroid', 'Incenter', 'Circumcenter', 'Orthocenter']
+CONSTRUCTION_LINES = {'Centroid': 'Generate_Medians', 'Incenter': 'Generate_AngleBisectors',
+                      'Circumcenter': 'Generate_PerpendicularBisectors', 'Orthocenter': 'Generate_Altitudes'}
+
+
+def _Exact_Point(v):
+    '''Convert the point v to a tuple of Fractions. Floats convert exactly.'''
+
+    from fractions import Fraction
+
+    return Fraction(v[0]), Fraction(v[1])
+
+
+def _Exact_Squared_Sides(P):
+    '''Return the exact squared side lengths (a^2, b^2, c^2) of the triangle with
+        Fraction vertices P.'''
+
+    A, B, C = P
+
+    return [(Q[0] - R[0])**2 + (Q[1] - R[1])**2 for Q, R in [(B, C), (C, A), (A, B)]]
+
+
+def _Is_Float_Exact(vertices):
+    '''True when every coordinate is exactly a float64, so float evaluation only adds
+        the rounding errors accounted for by the filters.'''
+
+    return all(float(x) == x for v in vertices for x in v[:2])
+
+
+def _Float_Squared_Sides(vertices):
+
+    A, B, C = [(float(v[0]), float(v[1])) for v in vertices]
+
+    return [(Q[0] - R[0])**2 + (Q[1] - R[1])**2 for Q, R in [(B, C), (C, A), (A, B)]]
+
+
+def _Center_Error_Bound(vertices, u = _UNIT_ROUNDOFF):
+    '''Bound on the float error of the computed centers of the triangle with the given
+        vertices, for unit roundoff u: a generous multiple of u*(M + L/sin(smallest angle)**2)
+        with M the largest vertex coordinate and L the longest side (see TriangleBatch).
+        Infinite for a degenerate triangle.'''
+
+    (ax, ay), (bx, by), (cx, cy) = [(float(v[0]), float(v[1])) for v in vertices]
+
+    M = max(abs(ax), abs(ay), abs(bx), abs(by), abs(cx), abs(cy))
+    S = sorted(_Float_Squared_Sides(vertices))
+    cross = abs((bx - ax)*(cy - ay) - (by - ay)*(cx - ax))
+
+    #The smallest angle is opposite the shortest side, sin = 2*area/(product of the others)
+    if cross == 0:
+        return math.inf
+    sine = cross/math.sqrt(S[1]*S[2])
+
+    return 32*u*(M + math.sqrt(S[2])/sine**2)
+
+
+def _Float_Centers(vertices):
+    '''Return the centroid, incenter, circumcenter and orthocenter of the triangle with
+        the given vertices in floats, solved relative to A with the orthocenter from
+        H = A + B + C - 2*O as in TriangleBatch, so that their errors are within
+        _Center_Error_Bound wherever the triangle lies.'''
+
+    (ax, ay), (bx, by), (cx, cy) = [(float(v[0]), float(v[1])) for v in vertices]
+
+    #B and C relative to A
+    Bx, By, Cx, Cy = bx - ax, by - ay, cx - ax, cy - ay
+
+    a = math.hypot(Cx - Bx, Cy - By)
+    b = math.hypot(Cx, Cy)
+    c = math.hypot(Bx, By)
+    p = a + b + c
+
+    d = 2*(Bx*Cy - By*Cx)
+    BB = Bx**2 + By**2
+    CC = Cx**2 + Cy**2
+    ox = ax + (Cy*BB - By*CC)/d
+    oy = ay + (Bx*CC - Cx*BB)/d
+
+    return [(ax + (Bx + Cx)/3, ay + (By + Cy)/3), (ax + (b*Bx + c*Cx)/p, ay + (b*By + c*Cy)/p), (ox, oy),
+            (ax + bx + cx - 2*ox, ay + by + cy - 2*oy)]
+
+
+def _Sides_Equal(S, T, exact_S, exact_T):
+    '''Filtered test of S == T for squared side lengths S and T. exact_S and exact_T
+        are callables giving the exact values, only used when the float values are
+        too close to decide.'''
+
+    if abs(S - T) > _SIDE_DIFFERENCE_ERROR*(S + T):
+        return False
+
+    return exact_S() == exact_T()
+
+
+#Scalar kernels for the single triangle hot paths. They follow the formulas of the
+#Triangle and LineSegment methods step by step on plain floats. The small kernels are
+#called one at a time by Triangle and LineSegment, and the fused kernels compute all
+#of a ScalarTriangle in two calls, so that they are worth compiling (see Set_Backend).
+#Squares are written as products: Python evaluates x**2 with pow, which can round
+#differently from the x*x of compiled code.
+
+def _Length_Kernel(ax, ay, bx, by):
+
+    dx = ax - bx
+    dy = ay - by
+
+    return math.sqrt(dx*dx + dy*dy)
+
+
+def _Angles_Kernel(a, b, c):
+
+    return math.acos((b*b + c*c - a*a)/(2*b*c)), math.acos((c*c + a*a - b*b)/(2*c*a)), math.acos((a*a + b*b - c*c)/(2*a*b))
+
+
+def _Circumcenter_Kernel(ax, ay, bx, by, cx, cy):
+
+    alpha = 2*(-ax + bx)
+    beta = 2*(-ay + by)
+    gamma = 2*(-bx + cx)
+    delta = 2*(-by + cy)
+
+    epsilon = bx*bx + by*by - ax*ax - ay*ay
+    xi = cx*cx + cy*cy - bx*bx - by*by
+
+    #Cramer's rule for [[alpha, beta], [gamma, delta]] P = [epsilon, xi]
+    det = alpha*delta - beta*gamma
+    if det == 0:
+        raise Exception('Degenerate triangles do not have a circumcenter!')
+
+    return (epsilon*delta - beta*xi)/det, (alpha*xi - gamma*epsilon)/det
+
+
+def _Intersection_Kernel(m1, b1, x1, m2, b2, x2):
+    '''Intersection of the lines with slopes m1, m2 and intercepts b1, b2. x1 and x2
+        are the x coordinates of a point on each line, used when it is vertical.'''
+
+    if m2 == m1:
+        raise Exception('Parallel lines do not have a unique point at which they intercept!')
+
+    return _Intersection_Point(m1, b1, x1, m2, b2, x2)
+
+
+def _Intersection_Point(m1, b1, x1, m2, b2, x2):
+    '''_Intersection_Kernel giving nan instead of raising for parallel lines.'''
+
+    if m2 == m1:
+        return math.nan, math.nan
+
+    if m1 == math.inf:
+        x = x1
+        y = m2*x + b2
+
+    elif m2 == math.inf:
+        x = x2
+        y = m1*x + b1
+
+    else:
+        x = (b2 - b1)/(m1 - m2)
+        y = m1*x + b1
+
+    return x, y
+
+
+def _Altitude_Line_Kernel(vx, vy, m2):
+    '''Slope and intercept of the altitude from (vx, vy) onto a leg with slope m2.'''
+
+    #Slope of the line which is perpendicular to the leg
+    if m2 == math.inf:
+        slope = 0.0
+    elif m2 == 0:
+        slope = math.inf
+    else:
+        slope = -1/m2
+
+    #Another point on the altitude besides the vertex
+    if slope == 0:
+        px, py = vx + 1, vy
+    elif slope == math.inf:
+        px, py = vx, vy + 1
+    else:
+        px = vx + 1
+        py = slope*px + (-slope*vx + vy)
+
+    #Slope and intercept of the line through those points, as LineSegment computes them
+    if vx != px:
+        m1 = (py - vy)/(px - vx)
+        b1 = vy - m1*vx
+    else:
+        m1 = math.inf
+        b1 = math.nan
+
+    return m1, b1
+
+
+def _Line(ax, ay, bx, by):
+    '''Slope and intercept of the line through (ax, ay) and (bx, by), as LineSegment computes them.'''
+
+    if ax != bx:
+        m = (by - ay)/(bx - ax)
+        return m, ay - m*ax
+
+    return math.inf, math.nan
+
+
+def _Triangle_Kernel(ax, ay, bx, by, cx, cy):
+    '''Fused kernel of the sides a, b, c and the angles of a ScalarTriangle.'''
+
+    a = _Length_Kernel(bx, by, cx, cy)
+    b = _Length_Kernel(cx, cy, ax, ay)
+    c = _Length_Kernel(ax, ay, bx, by)
+    alpha, beta, gamma = _Angles_Kernel(a, b, c)
+
+    return a, b, c, alpha, beta, gamma
+
+
+def _Centers_Kernel(ax, ay, bx, by, cx, cy, a, b, c):
+    '''Fused kernel of the incenter, circumcenter, orthocenter and the feet of the
+        altitudes from A, B and C of a ScalarTriangle with sides a, b, c, as 12 floats.
+        The points a degenerate triangle does not have are nan.'''
+
+    p = a + b + c
+    ix = (a*ax + b*bx + c*cx)/p
+    iy = (a*ay + b*by + c*cy)/p
+
+    #The circumcenter as in _Circumcenter_Kernel
+    alpha = 2*(-ax + bx)
+    beta = 2*(-ay + by)
+    gamma = 2*(-bx + cx)
+    delta = 2*(-by + cy)
+    epsilon = bx*bx + by*by - ax*ax - ay*ay
+    xi = cx*cx + cy*cy - bx*bx - by*by
+    det = alpha*delta - beta*gamma
+    if det == 0:
+        ox, oy = math.nan, math.nan
+    else:
+        ox, oy = (epsilon*delta - beta*xi)/det, (alpha*xi - gamma*epsilon)/det
+
+    #Feet of the altitudes onto the legs BC, CA and AB
+    m2, b2 = _Line(bx, by, cx, cy)
+    m1, b1 = _Altitude_Line_Kernel(ax, ay, m2)
+    fax, fay = _Intersection_Point(m1, b1, ax, m2, b2, bx)
+    m2, b2 = _Line(cx, cy, ax, ay)
+    m1, b1 = _Altitude_Line_Kernel(bx, by, m2)
+    fbx, fby = _Intersection_Point(m1, b1, bx, m2, b2, cx)
+    m2, b2 = _Line(ax, ay, bx, by)
+    m1, b1 = _Altitude_Line_Kernel(cx, cy, m2)
+    fcx, fcy = _Intersection_Point(m1, b1, cx, m2, b2, ax)
+
+    #The orthocenter where the altitudes from A and B meet
+    m1, b1 = _Line(ax, ay, fax, fay)
+    m2, b2 = _Line(bx, by, fbx, fby)
+    hx, hy = _Intersection_Point(m1, b1, ax, m2, b2, bx)
+
+    return ix, iy, ox, oy, hx, hy, fax, fay, fbx, fby, fcx, fcy
+
+
+_KERNEL_FUNCTIONS = {'Length': _Length_Kernel, 'Angles': _Angles_Kernel, 'Circumcenter': _Circumcenter_Kernel,
+                     'Intersection': _Intersection_Kernel, 'Altitude_Line': _Altitude_Line_Kernel,
+                     'Triangle': _Triangle_Kernel, 'Centers': _Centers_Kernel}
+
+#The kernels compiled by the 'numba' backend, and the functions they call
+_FUSED_KERNELS = ['Triangle', 'Centers']
+_FUSED_HELPERS = [_Length_Kernel, _Angles_Kernel, _Altitude_Line_Kernel, _Intersection_Point, _Line]
+
+#The backend of the single triangle methods: 'numpy' runs the original NumPy code,
+#'python' runs the kernels as plain Python and 'numba' runs the fused kernels JIT
+#compiled.
+#_kernels holds the kernels of the current backend, or None for 'numpy'.
+_backend = 'numpy'
+_kernels = None
+
+#The kernels run as plain Python, whatever the backend
+_PYTHON_KERNELS = SimpleNamespace(**_KERNEL_FUNCTIONS)
+
+
+class _Numba_Kernels:
+
+    '''The kernels of the 'numba' backend. Only the fused kernels are compiled: calling
+        a compiled function from Python costs about as much as running one of the small
+        kernels, so those stay plain Python. Numba is imported and each fused kernel
+        compiled (with the functions it calls) the first time it is used, so selecting
+        the backend costs nothing up front.'''
+
+    def __getattr__(self, kernel):
+
+        function = _KERNEL_FUNCTIONS[kernel]
+
+        if kernel in _FUSED_KERNELS:
+            import numba
+
+            #Call the compiled helpers from the compiled kernel
+            if '_helpers' not in self.__dict__:
+                self._helpers = {helper.__name__: numba.njit(cache = True)(helper) for helper in _FUSED_HELPERS}
+            function = numba.njit(cache = True)(FunctionType(function.__code__, dict(function.__globals__, **self._helpers),
+                                                             function.__name__))
+
+        setattr(self, kernel, function)
+
+        return function
+
+
+#One set, so the kernels are only compiled once however often the backend is selected
+_NUMBA_KERNELS = _Numba_Kernels()
+
+
+def Available_Backends():
+    '''Return the names of the backends that can be used in this environment. This
+        imports Numba to find out whether the 'numba' backend can be used.'''
+
+    backends = ['numpy', 'python']
+    if _Numba_Available():
+        backends.append('numba')
+
+    return backends
+
+
+def Get_Backend():
+    '''Return the name of the backend used by Triangle and LineSegment.'''
+
+    return _backend
+
+
+def Set_Backend(name):
+    '''Select the backend used by Triangle and LineSegment, one of Available_Backends().'''
+
+    global _backend, _kernels
+
+    #Numba is only imported when it is asked for
+    if name not in ['numpy', 'python'] and name not in Available_Backends():
+        raise ValueError('Unknown or unavailable geometry backend %r, expected one of %s' % (name, Available_Backends()))
+
+    if name == 'numpy':
+        kernels = None
+
+    elif name == 'python':
+        kernels = _PYTHON_KERNELS
+
+    else:
+        kernels = _NUMBA_KERNELS
+
+    _backend = name
+    _kernels = kernels
 
 
 class LineSegment:
@@ -48,6 +428,9 @@ class LineSegment:
     def Length(self):
         '''Calculate and return the length of the line segment.'''
 
+        if _kernels is not None:
+            return _kernels.Length(float(self.A[0]), float(self.A[1]), float(self.B[0]), float(self.B[1]))
+
         return math.sqrt(np.dot(self.A - self.B, self.A - self.B))
 
 
@@ -64,6 +447,9 @@ class LineSegment:
         m1, b1 = self._slope, self._intercept
         m2, b2 = lineseg._slope, lineseg._intercept
 
+        if _kernels is not None:
+            return _kernels.Intersection(float(m1), float(b1), float(self.A[0]), float(m2), float(b2), float(lineseg.A[0]))
+
         if m2 == m1:
             raise Exception('Parallel lines do not have a unique point at which they intercept!')
 
@@ -117,14 +503,24 @@ class Triangle:
 
     '''Defines a Triangle. Triangles are initialized by three vertices A, B, and C
         which are assumed to be numpy arrays of size 1x2. There will also be many
-        methods for this class.'''
+        methods for this class.
 
-    def __init__(self, A, B, C):
-        '''A, B, and C are numpy arrays defining the three vertices of the triangle.'''
+        In exact mode the rational centers (centroid, circumcenter and orthocenter)
+        are computed with Fractions from the exact values of the vertex coordinates,
+        so they are free of rounding error. The incenter, sides and angles involve
+        square roots and stay floating point.'''
+
+    def __init__(self, A, B, C, exact = False):
+        '''A, B, and C are numpy arrays defining the three vertices of the triangle.
+            exact turns on exact rational arithmetic for the rational centers.'''
 
         #Vertices of the Triangle
         self.Vertices = [A, B, C]
 
+        #Exact mode, and the vertices as Fractions (computed on first use)
+        self.exact = exact
+        self._exact_vertices = None
+
         #Legs of the Triangle
         self.Legs = self.Get_Legs()
 
@@ -149,6 +545,10 @@ class Triangle:
         '''Get the angles of the triangle'''
 
         a, b, c = self.Sides
+
+        if _kernels is not None:
+            return list(_kernels.Angles(float(a), float(b), float(c)))
+
         return [math.acos((b**2 + c**2 - a**2)/(2*b*c)), math.acos((c**2 + a**2 - b**2)/(2*c*a)), math.acos((a**2 + b**2 - c**2)/(2*a*b))]
 
 
@@ -212,6 +612,65 @@ class Triangle:
 
         return X, Y
 
+    def Generate_Construction_Lines(self, centers = None, out = None):
+        '''Return the construction lines of the given centers (all of CENTERS by default)
+            as one (len(centers), 3, 2, 2) array (center, line, endpoint, coordinate),
+            written into out if it is given.
+
+            The endpoints are computed on floats as in TriangleBatch, without building
+            a LineSegment per line: the midpoints of the legs, the feet of the angle
+            bisectors from the angle bisector theorem and the feet of the altitudes by
+            projection. Line i starts at vertex i or the midpoint of leg i.'''
+
+        if centers is None:
+            centers = CENTERS
+
+        shape = (len(centers), 3, 2, 2)
+        if out is None:
+            out = np.empty(shape)
+        elif out.shape != shape or not np.issubdtype(out.dtype, np.floating):
+            raise ValueError('out must be a floating point array of shape %s, got %s of shape %s' % (shape, out.dtype, out.shape))
+
+        V = [(float(v[0]), float(v[1])) for v in self.Vertices]
+        sides = [float(side) for side in self.Sides]
+        circumcenter = None
+
+        lines = []
+        for center in centers:
+            if center not in CONSTRUCTION_LINES:
+                raise ValueError('Unknown center %r, expected one of %s' % (center, CENTERS))
+            if center == 'Circumcenter' and circumcenter is None:
+                circumcenter = tuple(float(x) for x in self.Generate_Circumcenter())
+
+            center_lines = []
+            for i in range(3):
+                #Vertex i and the endpoints of leg i
+                (vx, vy), (px, py), (qx, qy) = V[i], V[(i + 1) % 3], V[(i + 2) % 3]
+
+                if center == 'Centroid':
+                    line = (vx, vy), ((px + qx)/2, (py + qy)/2)
+
+                elif center == 'Circumcenter':
+                    line = ((px + qx)/2, (py + qy)/2), circumcenter
+
+                elif center == 'Incenter':
+                    #The bisector from vertex i divides leg i in the ratio of the other sides
+                    p, q = sides[(i + 1) % 3], sides[(i + 2) % 3]
+                    line = (vx, vy), ((p*px + q*qx)/(p + q), (p*py + q*qy)/(p + q))
+
+                else:
+                    dx, dy = qx - px, qy - py
+                    t = ((vx - px)*dx + (vy - py)*dy)/(dx*dx + dy*dy)
+                    line = (vx, vy), (px + t*dx, py + t*dy)
+
+                center_lines.append(line)
+            lines.append(center_lines)
+
+        if lines:
+            out[...] = lines
+
+        return out
+
 
     def Get_Median(self, vertex, leg):
         '''A Median connects a vertex to the midpoint of the opposite side.
@@ -226,6 +685,13 @@ class Triangle:
     def Get_Altitude(self, vertex, leg):
         '''The Altitude goes through a vertex and is perpendicular to the opposite side.'''
 
+        if _kernels is not None:
+            vx, vy = float(vertex[0]), float(vertex[1])
+            m1, b1 = _kernels.Altitude_Line(vx, vy, float(leg._slope))
+            x, y = _kernels.Intersection(m1, b1, vx, float(leg._slope), float(leg._intercept), float(leg.A[0]))
+
+            return LineSegment(vertex, np.array([x, y]), 'Altitude')
+
         #First determine the slope of the leg
         slope = leg._slope
 
@@ -293,6 +759,9 @@ class Triangle:
     def Generate_Centroid(self):
         '''Determines the centroid of the triangle and returns a center object.'''
 
+        if self.exact:
+            return self.Generate_Exact_Centroid()
+
         A, B, C = self.Vertices
 
         #Centroid is simply the average of the three vertice coordinates
@@ -319,7 +788,12 @@ class Triangle:
     def Generate_Circumcenter(self):
         '''Determines the circumcenter of the triangle and returns a center object.'''
 
-        
+        if self.exact:
+            return self.Generate_Exact_Circumcenter()
+
+        if _kernels is not None:
+            (ax, ay), (bx, by), (cx, cy) = [(float(v[0]), float(v[1])) for v in self.Vertices]
+            return _kernels.Circumcenter(ax, ay, bx, by, cx, cy)
 
         X = [v[0] for v in self.Vertices]
         Y = [v[1] for v in self.Vertices]
@@ -344,6 +818,9 @@ class Triangle:
     def Generate_Orthocenter(self):
         '''Determines the orthocenter of the triangle and returns a center object.'''
 
+        if self.exact:
+            return self.Generate_Exact_Orthocenter()
+
         A, B, C = self.Vertices
         leg_A, leg_B, leg_C = self.Legs
 
@@ -357,13 +834,156 @@ class Triangle:
         return x, y
 
 
-    def Generate_Inscribed(self):
+    def Get_Exact_Vertices(self):
+        '''Return the vertices as tuples of Fractions.'''
+
+        if self._exact_vertices is None:
+            self._exact_vertices = [_Exact_Point(v) for v in self.Vertices]
+
+        return self._exact_vertices
+
+    def Generate_Exact_Centroid(self):
+        '''Determines the centroid of the triangle exactly, as a pair of Fractions.'''
+
+        A, B, C = self.Get_Exact_Vertices()
+
+        return (A[0] + B[0] + C[0])/3, (A[1] + B[1] + C[1])/3
+
+    def Generate_Exact_Circumcenter(self):
+        '''Determines the circumcenter of the triangle exactly, as a pair of Fractions.'''
+
+        A, B, C = self.Get_Exact_Vertices()
+
+        #Solve relative to A
+        bx, by = B[0] - A[0], B[1] - A[1]
+        cx, cy = C[0] - A[0], C[1] - A[1]
+
+        d = 2*(bx*cy - by*cx)
+        if d == 0:
+            raise Exception('Degenerate triangles do not have a circumcenter!')
+
+        bb = bx**2 + by**2
+        cc = cx**2 + cy**2
+
+        return A[0] + (cy*bb - by*cc)/d, A[1] + (bx*cc - cx*bb)/d
+
+    def Generate_Exact_Orthocenter(self):
+        '''Determines the orthocenter of the triangle exactly, as a pair of Fractions.'''
+
+        A, B, C = self.Get_Exact_Vertices()
+        x, y = self.Generate_Exact_Circumcenter()
+
+        #The orthocenter lies on the Euler line with H = A + B + C - 2*O
+        return A[0] + B[0] + C[0] - 2*x, A[1] + B[1] + C[1] - 2*y
+
+
+    def Get_Squared_Side_Equalities(self):
+        '''Return whether a^2 == b^2, b^2 == c^2 and c^2 == a^2, decided exactly.
+
+            This is a filtered predicate: the squared sides are compared in floats
+            first and exact Fraction arithmetic is only used when a difference is
+            within the float error bound (or the vertices are not exact floats).'''
+
+        exact_sides = []
+        def exact(i):
+            if not exact_sides:
+                exact_sides.extend(_Exact_Squared_Sides(self.Get_Exact_Vertices()))
+            return exact_sides[i]
+
+        if _Is_Float_Exact(self.Vertices):
+            S = _Float_Squared_Sides(self.Vertices)
+            return [_Sides_Equal(S[i], S[j], lambda i = i: exact(i), lambda j = j: exact(j)) for i, j in [(0, 1), (1, 2), (2, 0)]]
+
+        else:
+            return [exact(i) == exact(j) for i, j in [(0, 1), (1, 2), (2, 0)]]
+
+    def Is_Equilateral(self):
+        '''Exactly decide whether the triangle is equilateral (see Get_Squared_Side_Equalities).
+            No triangle with rational (or float) vertices is exactly equilateral, so
+            use Centers_Coincide to test for an equilateral triangle up to a tolerance.'''
+
+        ab, bc, ca = self.Get_Squared_Side_Equalities()
+
+        return ab and bc
+
+    def Is_Isosceles(self):
+        '''Exactly decide whether at least two sides of the triangle are equal.'''
+
+        return any(self.Get_Squared_Side_Equalities())
+
+    def Centers_Coincide(self, eps = 1e-9):
+        '''Decide whether the centroid, incenter, circumcenter and orthocenter all lie
+            within eps of each other, i.e. whether the triangle is equilateral up to
+            that tolerance.
+
+            This is a filtered predicate: the largest distance between the centers is
+            computed in floats and compared with eps, and only when it is within the
+            float error bound of eps are the squared distances compared exactly with
+            the Fraction centroid, circumcenter and orthocenter. The incenter is
+            irrational and stays floating point. The float centers are computed with
+            position independent formulas (see _Float_Centers) rather than the
+            methods of the current backend, whose circumcenter and orthocenter lose
+            accuracy far from the origin. In exact mode the filter is skipped.'''
+
+        error = _Center_Error_Bound(self.Vertices)
+
+        #Degenerate triangles have no float centers, the exact circumcenter raises
+        if math.isinf(error):
+            self.Generate_Exact_Circumcenter()
+
+        centers = _Float_Centers(self.Vertices)
+        incenter = centers[1]
+
+        if not self.exact:
+            distance = max(math.hypot(P[0] - Q[0], P[1] - Q[1]) for i, P in enumerate(centers) for Q in centers[i + 1:])
+
+            if distance > eps + error:
+                return False
+            if distance < eps - error:
+                return True
+
+        centers = [self.Generate_Exact_Centroid(), _Exact_Point(incenter), self.Generate_Exact_Circumcenter(),
+                   self.Generate_Exact_Orthocenter()]
+        eps = _Exact_Point((eps, 0))[0]
+
+        return all((P[0] - Q[0])**2 + (P[1] - Q[1])**2 <= eps**2 for i, P in enumerate(centers) for Q in centers[i + 1:])
+
+
+    def Get_Semiperimeter(self):
+        '''Get the semiperimeter of the triangle.'''
+
+        a, b, c = self.Sides
+
+        return (a + b + c)/2
+
+    def Get_Area(self):
+        '''Get the area of the triangle from its sides with Kahan's rearrangement of
+            Heron's formula, which stays accurate for slivers.'''
+
+        a, b, c = sorted(self.Sides, reverse = True)
+
+        product = (a + (b + c))*(c - (a - b))*(c + (a - b))*(a + (b - c))
+
+        return math.sqrt(max(product, 0))/4
+
+    def Get_Inradius(self):
+        '''Get the radius of the inscribed circle, r = Area/s.'''
+
+        return self.Get_Area()/self.Get_Semiperimeter()
+
+    def Get_Circumradius(self):
+        '''Get the radius of the circumscribed circle, R = abc/(4*Area).'''
 
         a, b, c = self.Sides
+
+        return a*b*c/(4*self.Get_Area())
+
+
+    def Generate_Inscribed(self):
+
         x, y = self.Generate_Incenter()
 
-        s = (a + b + c)/2
-        r = ((s-a)*(s-b)*(s-c)/s)**(1/2)
+        r = self.Get_Inradius()
 
         inscribed = Circle([x, y], r)
 
@@ -375,9 +995,8 @@ class Triangle:
     def Generate_Circumscribed(self):
 
         x, y = self.Generate_Circumcenter()
-        x2, y2 = self.Vertices[0][0], self.Vertices[0][1]
 
-        r = ((x - x2)**2 + (y - y2)**2)**(1/2)
+        r = self.Get_Circumradius()
 
         circumscribed = Circle([x, y], r)
 
@@ -387,5 +1006,1336 @@ class Triangle:
 
 
 
-    
-        
+#Cosines and sines of the angles used by Circle.Generate_Circle
+_CIRCLE_THETA = np.linspace(0, 2*math.pi, num = 360)
+_CIRCLE_COS = [math.cos(theta) for theta in _CIRCLE_THETA]
+_CIRCLE_SIN = [math.sin(theta) for theta in _CIRCLE_THETA]
+
+
+class ScalarTriangle(Triangle):
+
+    '''A Triangle for single triangle work that stores its vertices as tuples of floats
+        and computes everything with the scalar kernels of the current backend (the
+        Python kernels if the backend is 'numpy'), without creating LineSegments or small
+        NumPy arrays. The sides and angles come from one fused kernel call, and the
+        centers and altitude feet from another on first use. It has the attributes and
+        methods of Triangle, and its results are identical to those of Triangle under
+        the 'python' backend.'''
+
+    def __init__(self, A, B, C):
+        '''A, B, and C are the three vertices of the triangle (tuples, lists or arrays).'''
+
+        k = _kernels if _kernels is not None else _PYTHON_KERNELS
+
+        self._k = k
+        self.exact = False
+        self._exact_vertices = None
+
+        #Vertices of the Triangle
+        (ax, ay), (bx, by), (cx, cy) = [(float(v[0]), float(v[1])) for v in (A, B, C)]
+        self.Vertices = [(ax, ay), (bx, by), (cx, cy)]
+
+        #Legs of the Triangle (BC, CA, AB) as (slope, intercept, x of their first point)
+        self._legs = [_Line(bx, by, cx, cy) + (bx,), _Line(cx, cy, ax, ay) + (cx,), _Line(ax, ay, bx, by) + (ax,)]
+
+        #Sides and angles (in radians) of the Triangle
+        a, b, c, alpha, beta, gamma = k.Triangle(ax, ay, bx, by, cx, cy)
+        self.Sides = [a, b, c]
+        self.Angles = [alpha, beta, gamma]
+
+        #Centers and altitude feet (see _Centers_Kernel), computed on first use
+        self._centers = None
+
+    @property
+    def Legs(self):
+        '''The legs as LineSegments, only built if asked for.'''
+
+        A, B, C = [np.array(v) for v in self.Vertices]
+
+        return [LineSegment(B, C, 'Leg'), LineSegment(C, A, 'Leg'), LineSegment(A, B, 'Leg')]
+
+    def _Midpoints(self):
+
+        (ax, ay), (bx, by), (cx, cy) = self.Vertices
+
+        return [((bx + cx)/2, (by + cy)/2), ((cx + ax)/2, (cy + ay)/2), ((ax + bx)/2, (ay + by)/2)]
+
+    def _Centers(self, i):
+        '''Return point i of _Centers_Kernel: the incenter, circumcenter, orthocenter and
+            the feet of the altitudes from A, B and C.'''
+
+        if self._centers is None:
+            (ax, ay), (bx, by), (cx, cy) = self.Vertices
+            self._centers = self._k.Centers(ax, ay, bx, by, cx, cy, *self.Sides)
+
+        return self._centers[2*i], self._centers[2*i + 1]
+
+    def _Altitude_Foot(self, i):
+
+        x, y = self._Centers(3 + i)
+        if math.isnan(x):
+            raise Exception('Parallel lines do not have a unique point at which they intercept!')
+
+        return x, y
+
+    def _Lines(self, starts, ends):
+
+        return [[p[0], q[0]] for p, q in zip(starts, ends)], [[p[1], q[1]] for p, q in zip(starts, ends)]
+
+
+    def Generate_Triangle(self):
+        '''Return the x and y lists to plot the triangle'''
+
+        X = [v[0] for v in self.Vertices + [self.Vertices[0]]]
+        Y = [v[1] for v in self.Vertices + [self.Vertices[0]]]
+
+        return X, Y
+
+    def Generate_Medians(self):
+        '''Return a list of lists which are the x and y coordinates for the median lines.'''
+
+        return self._Lines(self.Vertices, self._Midpoints())
+
+    def Generate_PerpendicularBisectors(self):
+        '''Return a list of lists which are the x and y coordinates for the perpendicula bisectors.'''
+
+        cc = self.Generate_Circumcenter()
+
+        return self._Lines(self._Midpoints(), [cc]*3)
+
+    def Generate_AngleBisectors(self):
+        '''Return a list of lists which are the x and y coordinates for the angle bisectors.'''
+
+        ix, iy = self.Generate_Incenter()
+
+        feet = []
+        for (vx, vy), (m2, b2, x2) in zip(self.Vertices, self._legs):
+            #Connect the incenter to the vertex and intersect with the leg
+            m1, b1 = _Line(ix, iy, vx, vy)
+            feet.append(self._k.Intersection(m1, b1, ix, m2, b2, x2))
+
+        return self._Lines(self.Vertices, feet)
+
+    def Generate_Altitudes(self):
+        '''Return a list of lists which are the x and y coordinates for the altitudes.'''
+
+        return self._Lines(self.Vertices, [self._Altitude_Foot(i) for i in range(3)])
+
+
+    def Generate_Centroid(self):
+        '''Determines the centroid of the triangle.'''
+
+        (ax, ay), (bx, by), (cx, cy) = self.Vertices
+
+        return (ax + bx + cx)/3, (ay + by + cy)/3
+
+    def Generate_Incenter(self):
+        '''Determines the incenter of the triangle.'''
+
+        return self._Centers(0)
+
+    def Generate_Circumcenter(self):
+        '''Determines the circumcenter of the triangle.'''
+
+        x, y = self._Centers(1)
+        if math.isnan(x):
+            raise Exception('Degenerate triangles do not have a circumcenter!')
+
+        return x, y
+
+    def Generate_Orthocenter(self):
+        '''Determines the orthocenter of the triangle from the altitudes of A and B.'''
+
+        x, y = self._Centers(2)
+        if math.isnan(x):
+            raise Exception('Parallel lines do not have a unique point at which they intercept!')
+
+        return x, y
+
+
+    def _Generate_Circle(self, center, r):
+
+        x, y = center
+
+        return [r*cos + x for cos in _CIRCLE_COS], [r*sin + y for sin in _CIRCLE_SIN]
+
+    def Generate_Inscribed(self):
+
+        return self._Generate_Circle(self.Generate_Incenter(), self.Get_Inradius())
+
+    def Generate_Circumscribed(self):
+
+        return self._Generate_Circle(self.Generate_Circumcenter(), self.Get_Circumradius())
+
+
+#The representations of a single triangle: 'numpy' keeps the vertices as NumPy arrays
+#and builds LineSegments, 'scalar' works on tuples of floats
+TRIANGLE_CLASSES = {'numpy': Triangle, 'scalar': ScalarTriangle}
+
+
+class SimilarityCache:
+
+    '''An LRU cache of triangle centers keyed by shape. Every triangle is similar to a
+        canonical triangle with vertices (0, 0), (1, 0) and (x, y), y > 0, whose sides are
+        the triangle's sides divided by its longest side. The centers are computed once
+        for the canonical triangle with the Triangle methods and mapped back to any
+        similar triangle through the similarity transform, since all four centers
+        commute with translation, rotation, scaling and reflection.
+
+        The shape key is the pair of sorted side ratios rounded to decimals places, so
+        triangles whose ratios agree to that precision share an entry. The mapped
+        centers are then exact up to that rounding, i.e. to about 10**-decimals times
+        the longest side. The circumcenter and orthocenter of slivers are sensitive to
+        the shape, so their error grows roughly like 1/sin(smallest angle)**2 times that.'''
+
+    centers = CENTERS
+
+    def __init__(self, maxsize = 4096, decimals = 12):
+        '''maxsize is the maximum number of shapes kept in the cache.'''
+
+        self.maxsize = maxsize
+        self.decimals = decimals
+
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+
+        return len(self._entries)
+
+    def Canonicalize(self, A, B, C):
+        '''Return the shape key of the triangle ABC and the similarity transform
+            (alpha, beta, reflect) mapping the canonical triangle onto it: a canonical
+            point z (as a complex number) maps to alpha*z + beta, or alpha*conj(z) + beta
+            if reflect is True.'''
+
+        P = [complex(v[0], v[1]) for v in (A, B, C)]
+
+        #Side i is opposite vertex i
+        sides = [abs(P[1] - P[2]), abs(P[2] - P[0]), abs(P[0] - P[1])]
+        short, middle, longest = sorted(range(3), key = lambda i: sides[i])
+
+        #The canonical (0, 0) is the vertex opposite the shortest side, (1, 0) the vertex
+        #opposite the middle side and (x, y) the vertex opposite the longest side
+        key = (round(sides[short]/sides[longest], self.decimals), round(sides[middle]/sides[longest], self.decimals))
+
+        alpha = P[middle] - P[short]
+        beta = P[short]
+
+        #The canonical triangle is counterclockwise
+        u, w = P[middle] - P[short], P[longest] - P[short]
+        reflect = (u.real*w.imag - u.imag*w.real) < 0
+
+        return key, (alpha, beta, reflect)
+
+    def Get_Canonical_Centers(self, key):
+        '''Return the centers of the canonical triangle with shape key, as complex
+            numbers, computing and caching them on a miss.'''
+
+        entries = self._entries
+
+        if key in entries:
+            self.hits += 1
+            entries.move_to_end(key)
+            return entries[key]
+
+        self.misses += 1
+
+        s0, s1 = key
+        x = (1 + s1**2 - s0**2)/2
+        y = math.sqrt(max(s1**2 - x**2, 0))
+        triangle = Triangle(np.array([0.0, 0.0]), np.array([1.0, 0.0]), np.array([x, y]))
+
+        result = {}
+        for center in self.centers:
+            cx, cy = getattr(triangle, 'Generate_' + center)()
+            result[center] = complex(cx, cy)
+
+        entries[key] = result
+        if len(entries) > self.maxsize:
+            entries.popitem(last = False)
+
+        return result
+
+    def Get_Centers(self, A, B, C):
+        '''Return a dictionary of the (x, y) centers of the triangle ABC.'''
+
+        key, (alpha, beta, reflect) = self.Canonicalize(A, B, C)
+        canonical = self.Get_Canonical_Centers(key)
+
+        result = {}
+        for center, z in canonical.items():
+            if reflect:
+                z = z.conjugate()
+            p = alpha*z + beta
+            result[center] = p.real, p.imag
+
+        return result
+
+    def Get_Center(self, A, B, C, center):
+        '''Return the (x, y) center of the triangle ABC named center, e.g. 'Incenter'.'''
+
+        return self.Get_Centers(A, B, C)[center]
+
+    def Info(self):
+        '''Return the cache statistics as a dictionary.'''
+
+        lookups = self.hits + self.misses
+
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries),
+                'maxsize': self.maxsize, 'hit_rate': self.hits/lookups if lookups else 0.0}
+
+    def Clear(self):
+
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class TriangleBatch:
+
+    '''Defines a batch of N triangles whose centers and construction lines are computed
+        together with vectorized NumPy operations instead of one Triangle at a time.
+        Batches are initialized with a Vertices array of shape (N, 3, 2) holding the
+        x and y coordinates of the vertices A, B, and C of every triangle.
+
+        The methods mirror those of Triangle and follow the same conventions (legs are
+        ordered BC, CA, AB, and construction line i starts at vertex i or at the
+        midpoint of leg i), but return arrays: centers have shape (N, 2), construction
+        lines have shape (N, 3, 2, 2) (triangle, line, endpoint, coordinate), and
+        circles have shape (N, 360, 2).
+
+        The computations are carried out in dtype, float64 by default. float32 halves
+        the memory traffic and is accurate enough for display. With u the unit
+        roundoff of dtype (about 6e-8 for float32, 1.1e-16 for float64), L the longest
+        side and M the largest vertex coordinate, the errors are roughly:
+
+        - Centroid: a few u*M.
+        - Incenter, sides, medians and angle bisectors: a few u*(M + L).
+        - Angles: a few u/sin(angle) radians, which is larger for angles near 0 or pi.
+        - Circumcenter and orthocenter: about u*L/sin(smallest angle)**2 on top of u*M,
+          since both run off to infinity as the triangle degenerates.
+        - Radii: a few u relative, the circumradius also growing like 1/sin(smallest angle).'''
+
+    def __init__(self, Vertices, dtype = np.float64):
+        '''Vertices is an array-like of shape (N, 3, 2). dtype is the floating point
+            type of the computations.'''
+
+        Vertices = np.asarray(Vertices, dtype = dtype)
+        if Vertices.ndim != 3 or Vertices.shape[1:] != (3, 2):
+            raise ValueError('Vertices must have shape (N, 3, 2), got %s' % (Vertices.shape,))
+
+        #Vertices of the triangles
+        self.Vertices = Vertices
+
+        #Sides of the triangles, side i is opposite vertex i
+        self.Sides = self.Get_Sides()
+
+        #Angles of the triangles (in radians)
+        self.Angles = self.Get_Angles()
+
+    def __len__(self):
+
+        return len(self.Vertices)
+
+    def Get_Sides(self):
+        '''Get the (N, 3) sides of the triangles.'''
+
+        V = self.Vertices
+
+        #Leg i connects the two vertices other than vertex i
+        legs = np.roll(V, -2, axis = 1) - np.roll(V, -1, axis = 1)
+
+        return np.sqrt(np.einsum('nij,nij->ni', legs, legs))
+
+    def Get_Angles(self):
+        '''Get the (N, 3) angles of the triangles.'''
+
+        a, b, c = self.Sides.T
+
+        cosines = np.stack([(b**2 + c**2 - a**2)/(2*b*c), (c**2 + a**2 - b**2)/(2*c*a), (a**2 + b**2 - c**2)/(2*a*b)], axis = 1)
+
+        return np.arccos(np.clip(cosines, -1, 1))
+
+
+    def Generate_Triangle(self):
+        '''Return the (N, 4, 2) closed outlines of the triangles.'''
+
+        V = self.Vertices
+
+        return np.concatenate([V, V[:, :1]], axis = 1)
+
+    def Get_Midpoints(self):
+        '''Return the (N, 3, 2) midpoints of the legs.'''
+
+        V = self.Vertices
+
+        return (np.roll(V, -1, axis = 1) + np.roll(V, -2, axis = 1))/2
+
+    def Generate_Medians(self):
+        '''Return the (N, 3, 2, 2) medians, vertex i to the midpoint of leg i.'''
+
+        return np.stack([self.Vertices, self.Get_Midpoints()], axis = 2)
+
+    def Generate_PerpendicularBisectors(self):
+        '''Return the (N, 3, 2, 2) perpendicular bisectors, midpoint of leg i to the circumcenter.'''
+
+        mp = self.Get_Midpoints()
+        cc = np.broadcast_to(self.Generate_Circumcenter()[:, None, :], mp.shape)
+
+        return np.stack([mp, cc], axis = 2)
+
+    def Generate_AngleBisectors(self):
+        '''Return the (N, 3, 2, 2) angle bisectors, vertex i to leg i.'''
+
+        V = self.Vertices
+        sides = self.Sides
+
+        #By the angle bisector theorem the bisector from A meets BC at (b*B + c*C)/(b + c)
+        P, Q = np.roll(V, -1, axis = 1), np.roll(V, -2, axis = 1)
+        p, q = np.roll(sides, -1, axis = 1)[..., None], np.roll(sides, -2, axis = 1)[..., None]
+        feet = (p*P + q*Q)/(p + q)
+
+        return np.stack([V, feet], axis = 2)
+
+    def Generate_Altitudes(self):
+        '''Return the (N, 3, 2, 2) altitudes, vertex i to the foot on (the extension of) leg i.'''
+
+        V = self.Vertices
+
+        P, Q = np.roll(V, -1, axis = 1), np.roll(V, -2, axis = 1)
+        d = Q - P
+        t = np.einsum('nij,nij->ni', V - P, d)/np.einsum('nij,nij->ni', d, d)
+        feet = P + t[..., None]*d
+
+        return np.stack([V, feet], axis = 2)
+
+    def Generate_Construction_Lines(self, centers = None, out = None):
+        '''Return the construction lines of the given centers (all of CENTERS by default)
+            as one (N, len(centers), 3, 2, 2) array, written into out if it is given.'''
+
+        if centers is None:
+            centers = CENTERS
+
+        shape = (len(self.Vertices), len(centers), 3, 2, 2)
+        if out is None:
+            out = np.empty(shape, dtype = self.Vertices.dtype)
+        elif out.shape != shape or not np.issubdtype(out.dtype, np.floating):
+            raise ValueError('out must be a floating point array of shape %s, got %s of shape %s' % (shape, out.dtype, out.shape))
+
+        for k, center in enumerate(centers):
+            out[:, k] = getattr(self, CONSTRUCTION_LINES[center])()
+
+        return out
+
+
+    def Generate_Centroid(self):
+        '''Return the (N, 2) centroids.'''
+
+        return self.Vertices.mean(axis = 1)
+
+    def Generate_Incenter(self):
+        '''Return the (N, 2) incenters.'''
+
+        sides = self.Sides
+
+        return np.einsum('ni,nij->nj', sides, self.Vertices)/sides.sum(axis = 1)[:, None]
+
+    def Generate_Circumcenter(self):
+        '''Return the (N, 2) circumcenters.'''
+
+        A = self.Vertices[:, 0]
+
+        #Solve relative to A so large coordinate offsets do not cancel
+        B = self.Vertices[:, 1] - A
+        C = self.Vertices[:, 2] - A
+
+        d = 2*(B[:, 0]*C[:, 1] - B[:, 1]*C[:, 0])
+        BB = (B**2).sum(axis = 1)
+        CC = (C**2).sum(axis = 1)
+
+        x = (C[:, 1]*BB - B[:, 1]*CC)/d
+        y = (B[:, 0]*CC - C[:, 0]*BB)/d
+
+        return A + np.stack([x, y], axis = 1)
+
+    def Generate_Orthocenter(self):
+        '''Return the (N, 2) orthocenters.'''
+
+        #The orthocenter lies on the Euler line with H = A + B + C - 2*O
+        return self.Vertices.sum(axis = 1) - 2*self.Generate_Circumcenter()
+
+
+    def Get_Semiperimeter(self):
+        '''Get the (N,) semiperimeters.'''
+
+        return self.Sides.sum(axis = 1)/2
+
+    def Get_Area(self):
+        '''Get the (N,) areas with Kahan's stable form of Heron's formula (see Triangle.Get_Area).'''
+
+        c, b, a = np.sort(self.Sides, axis = 1).T
+
+        product = (a + (b + c))*(c - (a - b))*(c + (a - b))*(a + (b - c))
+
+        return np.sqrt(np.maximum(product, 0))/4
+
+    def Get_Inradius(self):
+        '''Get the (N,) inradii.'''
+
+        return self.Get_Area()/self.Get_Semiperimeter()
+
+    def Get_Circumradius(self):
+        '''Get the (N,) circumradii.'''
+
+        return self.Sides.prod(axis = 1)/(4*self.Get_Area())
+
+
+    def Generate_Inscribed(self):
+        '''Return the (N, 360, 2) inscribed circles.'''
+
+        return self._Generate_Circles(self.Generate_Incenter(), self.Get_Inradius())
+
+    def Generate_Circumscribed(self):
+        '''Return the (N, 360, 2) circumscribed circles.'''
+
+        return self._Generate_Circles(self.Generate_Circumcenter(), self.Get_Circumradius())
+
+    def Get_Squared_Side_Equalities(self):
+        '''Return an (N, 3) boolean array of whether a^2 == b^2, b^2 == c^2 and
+            c^2 == a^2 for every triangle, decided exactly with a filtered predicate:
+            all rows are compared in floats and only the rows whose differences are
+            within the float error bound are rechecked with Fractions.'''
+
+        #The error bound is for float64, which holds any lower precision input exactly
+        V = self.Vertices.astype(np.float64)
+
+        legs = np.roll(V, -2, axis = 1) - np.roll(V, -1, axis = 1)
+        S = np.einsum('nij,nij->ni', legs, legs)
+        T = np.roll(S, -1, axis = 1)
+
+        #Equalities that floats cannot rule out
+        uncertain = np.abs(S - T) <= _SIDE_DIFFERENCE_ERROR*(S + T)
+
+        equal = np.zeros(S.shape, dtype = bool)
+        for n in np.flatnonzero(uncertain.any(axis = 1)):
+            exact = _Exact_Squared_Sides([_Exact_Point(v) for v in V[n]])
+            equal[n] = [uncertain[n, i] and exact[i] == exact[(i + 1) % 3] for i in range(3)]
+
+        return equal
+
+    def Is_Equilateral(self):
+        '''Return an (N,) boolean array of which triangles are exactly equilateral. See
+            Triangle.Is_Equilateral; Centers_Coincide tests up to a tolerance.'''
+
+        equal = self.Get_Squared_Side_Equalities()
+
+        return equal[:, 0] & equal[:, 1]
+
+    def Is_Isosceles(self):
+        '''Return an (N,) boolean array of which triangles have two exactly equal sides.'''
+
+        return self.Get_Squared_Side_Equalities().any(axis = 1)
+
+    def Centers_Coincide(self, eps = 1e-9):
+        '''Return an (N,) boolean array of which triangles have their four centers
+            within eps of each other (see Triangle.Centers_Coincide). The distances are
+            computed in dtype, and only the triangles whose distance is within the
+            error bound of eps are decided again one at a time exactly.'''
+
+        u = np.finfo(self.Vertices.dtype).eps/2
+
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            centers = np.stack([self.Generate_Centroid(), self.Generate_Incenter(), self.Generate_Circumcenter(),
+                                self.Generate_Orthocenter()], axis = 1).astype(np.float64)
+
+            differences = centers[:, :, None, :] - centers[:, None, :, :]
+            distance = np.sqrt(np.einsum('nijk,nijk->nij', differences, differences)).max(axis = (1, 2))
+
+            #Error bound as in _Center_Error_Bound, in the unit roundoff of dtype
+            V = self.Vertices.astype(np.float64)
+            legs = np.roll(V, -2, axis = 1) - np.roll(V, -1, axis = 1)
+            S = np.sort(np.einsum('nij,nij->ni', legs, legs), axis = 1)
+            B = V[:, 1] - V[:, 0]
+            C = V[:, 2] - V[:, 0]
+            cross = np.abs(B[:, 0]*C[:, 1] - B[:, 1]*C[:, 0])
+            sine = cross/np.sqrt(S[:, 1]*S[:, 2])
+            error = 32*u*(np.abs(V).max(axis = (1, 2)) + np.sqrt(S[:, 2])/sine**2)
+
+        #Degenerate triangles have no centers, nan distances compare False
+        coincide = distance < eps - error
+
+        for n in np.flatnonzero(~coincide & ~(distance > eps + error) & (cross > 0)):
+            coincide[n] = Triangle(*V[n], exact = True).Centers_Coincide(eps)
+
+        return coincide
+
+    def _Generate_Circles(self, centers, r):
+
+        Theta = np.linspace(0, 2*math.pi, num = 360)
+        unit = np.stack([np.cos(Theta), np.sin(Theta)], axis = 1).astype(centers.dtype)
+
+        return centers[:, None, :] + r[:, None, None]*unit[None, :, :]
+
+
+class TriangleIndex:
+
+    '''An index over a large set of triangles for tolerance queries about their shape
+        and centers. The index is built from cheap invariants of the side lengths only,
+        computed once for all triangles with TriangleBatch:
+
+        - the sorted side ratios, for near-equilateral and near-isosceles queries,
+        - buckets of the sorted angles, for queries about a given shape,
+        - for each pair of centers queried, a lower bound on the distance between them
+          computed in closed form from the sides (see Get_Center_Distances).
+
+        Queries narrow the triangles to candidates with the invariants and only compute
+        centers from the coordinates for the candidates. All queries return sorted row
+        indices into Vertices.'''
+
+    def __init__(self, Vertices, angle_bucket = 1.0):
+        '''Vertices is an array-like of shape (N, 3, 2). angle_bucket is the width in
+            degrees of the angle buckets.'''
+
+        batch = TriangleBatch(Vertices)
+
+        self.Vertices = batch.Vertices
+        self.angle_bucket = angle_bucket
+
+        #Sorted sides (shortest first) and the longest side
+        sides = np.sort(batch.Sides, axis = 1)
+        self.Sides = sides
+        self._longest = sides[:, 2]
+
+        #How far each triangle is from equilateral and from isosceles, as relative side differences
+        equilateral = 1 - sides[:, 0]/sides[:, 2]
+        isosceles = np.minimum(1 - sides[:, 0]/sides[:, 1], 1 - sides[:, 1]/sides[:, 2])
+        self._equilateral = self._Sorted_Column(equilateral)
+        self._isosceles = self._Sorted_Column(isosceles)
+
+        #Sorted angles in degrees, bucketed on the two smallest (the third is determined)
+        angles = np.sort(np.degrees(batch.Angles), axis = 1)
+        self.Angles = angles
+        buckets = np.floor(angles[:, :2]/angle_bucket).astype(np.int64)
+        self._bucket_stride = int(180//angle_bucket) + 2
+        keys = buckets[:, 0]*self._bucket_stride + buckets[:, 1]
+        order = np.argsort(keys, kind = 'stable')
+        self._bucket_keys, self._bucket_starts = np.unique(keys[order], return_index = True)
+        self._bucket_order = order
+
+        #Sorted center distance lower bounds, computed per pair of centers on first use
+        self._center_distances = {}
+
+    def __len__(self):
+
+        return len(self.Vertices)
+
+    def _Sorted_Column(self, values):
+
+        order = np.argsort(values, kind = 'stable')
+
+        return values[order], order
+
+    def _Rows_Below(self, column, limit):
+        '''Return the sorted rows whose value in the sorted column is at most limit.'''
+
+        values, order = column
+
+        return np.sort(order[:np.searchsorted(values, limit, side = 'right')])
+
+
+    def Query_Equilateral(self, tolerance):
+        '''Return the triangles whose shortest side is within a relative tolerance of
+            the longest, i.e. 1 - min/max <= tolerance.'''
+
+        return self._Rows_Below(self._equilateral, tolerance)
+
+    def Query_Isosceles(self, tolerance):
+        '''Return the triangles with two sides within a relative tolerance of each other.'''
+
+        return self._Rows_Below(self._isosceles, tolerance)
+
+    def Query_Angles(self, angles, tolerance):
+        '''Return the triangles whose angles, in degrees, are each within tolerance of
+            angles (in any order). Only the rows in the matching angle buckets are checked.'''
+
+        target = np.sort(np.asarray(angles, dtype = float))
+        w = self.angle_bucket
+
+        ranges = [range(int(math.floor((t - tolerance)/w)), int(math.floor((t + tolerance)/w)) + 1) for t in target[:2]]
+
+        candidates = []
+        for b0 in ranges[0]:
+            for b1 in ranges[1]:
+                key = b0*self._bucket_stride + b1
+                i = np.searchsorted(self._bucket_keys, key)
+                if i < len(self._bucket_keys) and self._bucket_keys[i] == key:
+                    end = self._bucket_starts[i + 1] if i + 1 < len(self._bucket_keys) else len(self._bucket_order)
+                    candidates.append(self._bucket_order[self._bucket_starts[i]:end])
+
+        if not candidates:
+            return np.array([], dtype = np.int64)
+
+        rows = np.concatenate(candidates)
+        match = np.all(np.abs(self.Angles[rows] - target) <= tolerance, axis = 1)
+
+        return np.sort(rows[match])
+
+
+    def Get_Center_Distances(self, center1, center2):
+        '''Return the (N,) distances between two centers ('Centroid', 'Incenter',
+            'Circumcenter' or 'Orthocenter') computed from the side lengths alone.
+
+            With the centers in normalized barycentric coordinates P and Q, and
+            (x, y, z) = P - Q, the squared distance is -(a^2 yz + b^2 zx + c^2 xy).'''
+
+        a, b, c = self.Sides.T
+        aa, bb, cc = a**2, b**2, c**2
+
+        SA, SB, SC = (bb + cc - aa)/2, (cc + aa - bb)/2, (aa + bb - cc)/2
+        barycentrics = {
+            'Centroid': (np.ones_like(a), np.ones_like(a), np.ones_like(a)),
+            'Incenter': (a, b, c),
+            'Circumcenter': (aa*SA, bb*SB, cc*SC),
+            'Orthocenter': (SB*SC, SC*SA, SA*SB),
+            }
+
+        def normalized(center):
+            u, v, w = barycentrics[center]
+            total = u + v + w
+            return u/total, v/total, w/total
+
+        (u1, v1, w1), (u2, v2, w2) = normalized(center1), normalized(center2)
+        x, y, z = u1 - u2, v1 - v2, w1 - w2
+
+        return np.sqrt(np.maximum(-(aa*y*z + bb*z*x + cc*x*y), 0))
+
+    def Query_Centers_Within(self, center1, center2, epsilon):
+        '''Return the triangles whose center1 and center2 (e.g. 'Incenter' and
+            'Circumcenter') are within epsilon of each other.
+
+            The closed form distances lose about half the digits to cancellation when
+            the centers nearly coincide, and more for slivers whose circumcenter is far
+            away, so they are lowered by 1e-7 of the longest side plus 1e-5 of the
+            distance itself and used only to select candidates. The candidates are then
+            checked against the centers computed from the coordinates.'''
+
+        pair = tuple(sorted([center1, center2]))
+        if pair not in self._center_distances:
+            distances = self.Get_Center_Distances(*pair)
+            lower = np.maximum((1 - 1e-5)*distances - 1e-7*self._longest, 0)
+            self._center_distances[pair] = self._Sorted_Column(lower)
+
+        rows = self._Rows_Below(self._center_distances[pair], epsilon)
+        if len(rows) == 0:
+            return rows
+
+        batch = TriangleBatch(self.Vertices[rows])
+        P = getattr(batch, 'Generate_' + center1)()
+        Q = getattr(batch, 'Generate_' + center2)()
+
+        return rows[np.linalg.norm(P - Q, axis = 1) <= epsilon]
+
+
+
+class TriangleMesh:
+
+    '''Defines a 2D triangle mesh by a (V, 2) array of Points and an (F, 3) integer array
+        of Faces indexing into Points. Each face is a triangle whose vertices A, B and C
+        are the points of its three indices, so shared vertices are stored once.
+
+        The centers of all faces are computed with TriangleBatch over chunks of
+        chunk_size faces, so the temporary arrays stay bounded however large the mesh.
+        The computed centers are kept in Centers, and Move_Vertices updates them for
+        only the faces incident to the moved vertices. Points, the computations and the
+        centers use dtype (see TriangleBatch for the accuracy of float32). Points and
+        Faces are copied, so moving vertices never changes the caller's arrays.'''
+
+    centers = CENTERS
+
+    def __init__(self, Points, Faces, chunk_size = 65536, dtype = np.float64):
+
+        Points = np.array(Points, dtype = dtype)
+        Faces = np.array(Faces)
+
+        if Points.ndim != 2 or Points.shape[1] != 2:
+            raise ValueError('Points must have shape (V, 2), got %s' % (Points.shape,))
+        if Faces.ndim != 2 or Faces.shape[1] != 3 or not np.issubdtype(Faces.dtype, np.integer):
+            raise ValueError('Faces must be an integer array of shape (F, 3)')
+
+        self.Points = Points
+        self.Faces = Faces
+        self.chunk_size = chunk_size
+        self.dtype = Points.dtype
+
+        #Centers computed so far, kept up to date by Move_Vertices
+        self.Centers = {}
+
+        #Vertex to face adjacency, built on first use
+        self._vertex_face_offsets = None
+        self._vertex_faces = None
+
+    def __len__(self):
+
+        return len(self.Faces)
+
+    def Get_Vertex_Faces(self, vertices):
+        '''Return the sorted indices of the faces incident to any of the given vertices.
+
+            The adjacency is stored in compressed form: the faces of vertex v are
+            _vertex_faces[_vertex_face_offsets[v]:_vertex_face_offsets[v + 1]].'''
+
+        if self._vertex_faces is None:
+            corners = self.Faces.ravel()
+            order = np.argsort(corners, kind = 'stable')
+            counts = np.bincount(corners, minlength = len(self.Points))
+
+            self._vertex_faces = order//3
+            self._vertex_face_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        offsets = self._vertex_face_offsets
+        faces = [self._vertex_faces[offsets[v]:offsets[v + 1]] for v in np.atleast_1d(vertices)]
+
+        if not faces:
+            return np.array([], dtype = np.int64)
+
+        return np.unique(np.concatenate(faces))
+
+    def Move_Vertices(self, vertices, positions):
+        '''Move the given vertices to the (n, 2) positions and recompute the kept
+            Centers of only the faces incident to them. Returns those faces.'''
+
+        vertices = np.atleast_1d(vertices)
+        self.Points[vertices] = np.asarray(positions, dtype = self.dtype).reshape(len(vertices), 2)
+
+        faces = self.Get_Vertex_Faces(vertices)
+
+        if len(faces) > 0 and self.Centers:
+            batch = TriangleBatch(self.Get_Face_Vertices(faces), dtype = self.dtype)
+            for center, values in self.Centers.items():
+                values[faces] = getattr(batch, 'Generate_' + center)()
+
+        return faces
+
+    def Get_Face_Vertices(self, faces):
+        '''Gather the (n, 3, 2) vertices of the faces selected by faces (a slice or an
+            array of face indices).'''
+
+        return self.Points[self.Faces[faces]]
+
+    def Generate_Centers(self, centers = None, out = None):
+        '''Compute the centers named in centers (all four by default) for every face.
+
+            Returns a dictionary mapping each center to an (F, 2) array. out may be a
+            dictionary of preallocated (F, 2) arrays (e.g. memmaps) to write into.'''
+
+        if centers is None:
+            centers = self.centers
+
+        F = len(self.Faces)
+
+        if out is None:
+            out = {}
+        for center in centers:
+            if center not in out:
+                out[center] = np.empty((F, 2), dtype = self.dtype)
+
+        for start in range(0, F, self.chunk_size):
+            end = min(start + self.chunk_size, F)
+            batch = TriangleBatch(self.Get_Face_Vertices(slice(start, end)), dtype = self.dtype)
+
+            for center in centers:
+                out[center][start:end] = getattr(batch, 'Generate_' + center)()
+
+        self.Centers.update(out)
+
+        return out
+
+    def Generate_Centroid(self):
+        '''Return the (F, 2) centroids of the faces.'''
+
+        return self.Generate_Centers(['Centroid'])['Centroid']
+
+    def Generate_Incenter(self):
+        '''Return the (F, 2) incenters of the faces.'''
+
+        return self.Generate_Centers(['Incenter'])['Incenter']
+
+    def Generate_Circumcenter(self):
+        '''Return the (F, 2) circumcenters of the faces.'''
+
+        return self.Generate_Centers(['Circumcenter'])['Circumcenter']
+
+    def Generate_Orthocenter(self):
+        '''Return the (F, 2) orthocenters of the faces.'''
+
+        return self.Generate_Centers(['Orthocenter'])['Orthocenter']
+
+
+def _Incenter_Euler_Distance(batch):
+    '''Distance from the incenter to the Euler line through the centroid and circumcenter
+        (undefined for equilateral triangles, where the line degenerates to a point).'''
+
+    G = batch.Generate_Centroid()
+    u = batch.Generate_Circumcenter() - G
+    w = batch.Generate_Incenter() - G
+
+    return np.abs(u[:, 0]*w[:, 1] - u[:, 1]*w[:, 0])/np.hypot(u[:, 0], u[:, 1])
+
+def _Orthocenter_Inside(batch):
+    '''1 where the orthocenter lies inside the triangle, i.e. the triangle is acute, else 0.'''
+
+    squared_sides = batch.Sides**2
+
+    return (squared_sides.sum(axis = 1) > 2*squared_sides.max(axis = 1)).astype(batch.Vertices.dtype)
+
+
+#Scalar quantities VertexSweep can map, each computing an (N,) array from a TriangleBatch
+SWEEP_QUANTITIES = {
+    'Incenter_Euler_Distance': _Incenter_Euler_Distance,
+    'Orthocenter_Inside': _Orthocenter_Inside,
+    'Circumradius': TriangleBatch.Get_Circumradius,
+    'Inradius': TriangleBatch.Get_Inradius,
+    'Area': TriangleBatch.Get_Area,
+    }
+
+
+class VertexSweep:
+
+    '''Maps a scalar quantity of SWEEP_QUANTITIES over the positions of one vertex of a
+        triangle while the other two stay fixed, e.g. to show how the circumradius or the
+        position of the incenter relative to the Euler line depends on the shape.
+
+        The plane is divided into square tiles of tile_size x tile_size pixels, with a
+        pixel size that is a power of two, and every tile is evaluated in one vectorized
+        TriangleBatch pass. Tiles are kept in an LRU cache of at most maxtiles tiles
+        keyed by the quantity, the fixed vertices and the tile position, so panning and
+        zooming within a factor of two only computes the tiles that come into view.
+        Positions where the triangle degenerates give nan or inf.'''
+
+    def __init__(self, tile_size = 256, maxtiles = 128, dtype = np.float64):
+
+        self.tile_size = tile_size
+        self.maxtiles = maxtiles
+        self.dtype = np.dtype(dtype)
+
+        self._tiles = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+
+        return len(self._tiles)
+
+    def Get_Field(self, Vertices, vertex, quantity, X, Y):
+        '''Return quantity of the triangles with the (3, 2) Vertices whose vertex (0, 1
+            or 2) is moved to each of the positions X, Y (arrays of the same shape).
+            The result has the shape of X.'''
+
+        X, Y = np.broadcast_arrays(X, Y)
+
+        Sweep = np.empty((X.size, 3, 2), dtype = self.dtype)
+        Sweep[:] = np.asarray(Vertices, dtype = self.dtype)
+        Sweep[:, vertex, 0] = X.ravel()
+        Sweep[:, vertex, 1] = Y.ravel()
+
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            values = SWEEP_QUANTITIES[quantity](TriangleBatch(Sweep, dtype = self.dtype))
+
+        return values.reshape(X.shape)
+
+    def Get_Tile(self, Vertices, vertex, quantity, level, i, j):
+        '''Return the (tile_size, tile_size) tile (i, j) of quantity at pixel size
+            2**level, computing and caching it on a miss. Row r, column k of the tile
+            is the value at the pixel center ((i*tile_size + k + 0.5)*2**level,
+            (j*tile_size + r + 0.5)*2**level).'''
+
+        fixed = tuple(float(value) for k, v in enumerate(Vertices) if k != vertex for value in v)
+        key = (quantity, vertex, fixed, level, i, j)
+
+        tiles = self._tiles
+
+        if key in tiles:
+            self.hits += 1
+            tiles.move_to_end(key)
+            return tiles[key]
+
+        self.misses += 1
+
+        n = self.tile_size
+        pixel = 2.0**level
+        x = (i*n + np.arange(n) + 0.5)*pixel
+        y = (j*n + np.arange(n) + 0.5)*pixel
+
+        tile = self.Get_Field(Vertices, vertex, quantity, x[None, :], y[:, None])
+
+        tiles[key] = tile
+        if len(tiles) > self.maxtiles:
+            tiles.popitem(last = False)
+
+        return tile
+
+    def Render(self, Vertices, vertex, quantity, xlim, ylim, resolution = 512):
+        '''Return (image, extent) covering the region xlim x ylim with between
+            resolution/2 and resolution pixels across its larger side. image is
+            indexed [y, x] with y increasing, and extent = (left, right, bottom, top)
+            is the (slightly larger) region it covers, as imshow(origin = 'lower') expects.'''
+
+        size = max(xlim[1] - xlim[0], ylim[1] - ylim[0])
+        level = math.ceil(math.log2(size/resolution))
+        span = self.tile_size*2.0**level
+
+        i0, i1 = math.floor(xlim[0]/span), math.ceil(xlim[1]/span)
+        j0, j1 = math.floor(ylim[0]/span), math.ceil(ylim[1]/span)
+
+        image = np.block([[self.Get_Tile(Vertices, vertex, quantity, level, i, j) for i in range(i0, i1)]
+                          for j in range(j0, j1)])
+
+        return image, (i0*span, i1*span, j0*span, j1*span)
+
+    def Info(self):
+        '''Return the cache statistics as a dictionary.'''
+
+        lookups = self.hits + self.misses
+
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._tiles),
+                'maxsize': self.maxtiles, 'hit_rate': self.hits/lookups if lookups else 0.0}
+
+    def Clear(self):
+
+        self._tiles.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+#Columns written by Generate_Metrics and Export_Metrics, in order
+METRIC_COLUMNS = ['side_a', 'side_b', 'side_c', 'angle_A', 'angle_B', 'angle_C',
+                  'centroid_x', 'centroid_y', 'incenter_x', 'incenter_y',
+                  'circumcenter_x', 'circumcenter_y', 'orthocenter_x', 'orthocenter_y',
+                  'inradius', 'circumradius']
+
+#Version of the results of this module, part of the keys of cached results (see
+#Cached_Metrics). Bump it whenever a computation changes its results, so that entries
+#written by older code are not found.
+GEOMETRY_VERSION = 1
+
+
+def Generate_Metrics(Vertices, dtype = np.float64):
+    '''Return a dictionary of the METRIC_COLUMNS, each an (N,) array of dtype, for the
+        triangles with the (N, 3, 2) array Vertices.'''
+
+    batch = TriangleBatch(Vertices, dtype = dtype)
+    a, b, c = batch.Sides.T
+
+    columns = {'side_a': a, 'side_b': b, 'side_c': c}
+    columns.update(zip(['angle_A', 'angle_B', 'angle_C'], batch.Angles.T))
+
+    for center in CENTERS:
+        P = getattr(batch, 'Generate_' + center)()
+        columns[center.lower() + '_x'] = P[:, 0]
+        columns[center.lower() + '_y'] = P[:, 1]
+
+    columns['inradius'] = batch.Get_Inradius()
+    columns['circumradius'] = batch.Get_Circumradius()
+
+    return {column: np.ascontiguousarray(columns[column]) for column in METRIC_COLUMNS}
+
+
+def _Chunks(Vertices, chunk_size, dtype = np.float64):
+    '''Yield (n, 3, 2) chunks of Vertices, which is either an array-like (e.g. a memmap)
+        or an iterable of chunks.'''
+
+    if hasattr(Vertices, 'shape'):
+        for start in range(0, len(Vertices), chunk_size):
+            yield np.asarray(Vertices[start:start + chunk_size], dtype = dtype)
+    else:
+        for chunk in Vertices:
+            yield np.asarray(chunk, dtype = dtype)
+
+
+def Export_Metrics(Vertices, filename, chunk_size = 1000000, dtype = np.float64):
+    '''Compute the METRIC_COLUMNS for a large set of triangles chunk by chunk and write
+        them as one contiguous column per metric. Only one chunk of rows is held in
+        memory at a time.
+
+        Vertices is an (N, 3, 2) array-like (e.g. a memmap) or an iterable of (n, 3, 2)
+        chunks. If filename ends in .npz the columns are written to an (uncompressed)
+        .npz archive, otherwise filename is a directory that receives one <column>.npy
+        file per column, which np.load can memory-map. The columns have type dtype.
+        Returns the number of rows.'''
+
+    import shutil
+    import tempfile
+    import zipfile
+
+    dtype = np.dtype(dtype)
+
+    #Each column is spooled to a temporary file, then written behind its .npy header
+    #once the number of rows is known
+    spools = {column: tempfile.TemporaryFile() for column in METRIC_COLUMNS}
+    rows = 0
+
+    try:
+        for chunk in _Chunks(Vertices, chunk_size, dtype):
+            metrics = Generate_Metrics(chunk, dtype)
+            for column in METRIC_COLUMNS:
+                spools[column].write(metrics[column].astype(dtype).tobytes())
+            rows += len(chunk)
+
+        header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (rows,)}
+
+        def write_column(column, fp):
+            np.lib.format.write_array_header_2_0(fp, header)
+            spool = spools[column]
+            spool.seek(0)
+            shutil.copyfileobj(spool, fp)
+
+        if filename.endswith('.npz'):
+            with zipfile.ZipFile(filename, 'w', zipfile.ZIP_STORED, allowZip64 = True) as archive:
+                for column in METRIC_COLUMNS:
+                    with archive.open(column + '.npy', 'w', force_zip64 = True) as fp:
+                        write_column(column, fp)
+        else:
+            os.makedirs(filename, exist_ok = True)
+            for column in METRIC_COLUMNS:
+                with open(os.path.join(filename, column + '.npy'), 'wb') as fp:
+                    write_column(column, fp)
+
+    finally:
+        for spool in spools.values():
+            spool.close()
+
+    return rows
+
+
+class DiskCache:
+
+    '''A persistent content-addressed cache of bytes in directory. Entries are stored
+        under the SHA-256 of their key parts (see Key), so anything whose inputs are
+        unchanged is found again by later runs. Once the entries exceed max_bytes the
+        least recently used ones are deleted. Entries are written atomically, so
+        several processes may share a directory.
+
+        The sizes and access times of the entries are kept in memory, read from the
+        directory when the cache is opened, so storing an entry rarely walks the
+        directory. Entries written by other processes are only seen when the index is
+        read again from the directory, which happens before every eviction and after
+        every rescan_bytes (an eighth of max_bytes by default) stored by this process.
+        Several processes sharing a directory can so overshoot max_bytes by about
+        rescan_bytes each.'''
+
+    def __init__(self, directory, max_bytes = 2**30, rescan_bytes = None):
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.rescan_bytes = max_bytes//8 if rescan_bytes is None else rescan_bytes
+
+        os.makedirs(directory, exist_ok = True)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._Rescan()
+
+    def __len__(self):
+
+        return len(self._index)
+
+    @staticmethod
+    def Key(*parts):
+        '''Return the hex digest identifying parts, which may be arrays, numbers,
+            strings, and (nested) lists, tuples and dictionaries of them. Arrays are
+            hashed by their dtype, shape and contents.'''
+
+        import hashlib
+
+        digest = hashlib.sha256()
+
+        def update(part):
+            if isinstance(part, np.ndarray):
+                digest.update(b'array%s%s' % (part.dtype.str.encode(), repr(part.shape).encode()))
+                digest.update(np.ascontiguousarray(part).tobytes())
+            elif isinstance(part, dict):
+                digest.update(b'dict%d' % len(part))
+                for key in sorted(part, key = repr):
+                    update(key)
+                    update(part[key])
+            elif isinstance(part, (list, tuple)):
+                digest.update(b'list%d' % len(part))
+                for item in part:
+                    update(item)
+            else:
+                text = repr(part).encode()
+                digest.update(b'%s%d:%s' % (type(part).__name__.encode(), len(text), text))
+
+        for part in parts:
+            update(part)
+
+        return digest.hexdigest()
+
+    def _Path(self, key):
+
+        return os.path.join(self.directory, key[:2], key)
+
+    def _Entries(self):
+        '''Return (path, size, mtime) of every entry, walking the directory.'''
+
+        entries = []
+        for root, directories, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+
+        return entries
+
+    def _Rescan(self):
+        '''Read the index of path: (size, mtime) of every entry from the directory,
+            including those written by other processes.'''
+
+        self._index = {path: (size, mtime) for path, size, mtime in self._Entries()}
+        self._bytes = sum(size for size, mtime in self._index.values())
+
+        #Bytes stored by this process since the index was read
+        self._written = 0
+
+    def Get(self, key):
+        '''Return the bytes stored under key, or None.'''
+
+        path = self._Path(key)
+
+        try:
+            with open(path, 'rb') as fp:
+                data = fp.read()
+        except FileNotFoundError:
+            self.misses += 1
+            if self._index.pop(path, None) is not None:
+                self._bytes = sum(size for size, mtime in self._index.values())
+            return None
+
+        self.hits += 1
+
+        #The modification time orders the entries for eviction
+        try:
+            os.utime(path)
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return data
+
+        if path not in self._index:
+            self._bytes += len(data)
+        self._index[path] = (len(data), mtime)
+
+        return data
+
+    def Put(self, key, data):
+        '''Store the bytes data under key, evicting old entries if needed.'''
+
+        path = self._Path(key)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+
+        import tempfile
+
+        fd, temporary = tempfile.mkstemp(dir = os.path.dirname(path), suffix = '.tmp')
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(data)
+        os.replace(temporary, path)
+
+        replaced, mtime = self._index.get(path, (0, None))
+        self._index[path] = (len(data), os.stat(path).st_mtime)
+
+        self._bytes += len(data) - replaced
+        self._written += len(data)
+        if self._bytes > self.max_bytes or self._written > self.rescan_bytes:
+            self.Evict()
+
+    def Get_Arrays(self, key):
+        '''Return the dictionary of arrays stored under key by Put_Arrays, or None.'''
+
+        data = self.Get(key)
+        if data is None:
+            return None
+
+        with np.load(io.BytesIO(data)) as archive:
+            return {name: archive[name] for name in archive.files}
+
+    def Put_Arrays(self, key, arrays):
+        '''Store the dictionary of arrays under key.'''
+
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        self.Put(key, buffer.getvalue())
+
+    def Evict(self):
+        '''Delete the least recently used entries, of every process, until they fit
+            in max_bytes.'''
+
+        self._Rescan()
+
+        entries = sorted(self._index.items(), key = lambda entry: entry[1][1])
+        total = sum(size for path, (size, mtime) in entries)
+
+        for path, (size, mtime) in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            del self._index[path]
+            total -= size
+            self.evictions += 1
+
+        self._bytes = total
+
+    def Info(self):
+        '''Return the cache statistics as a dictionary.'''
+
+        lookups = self.hits + self.misses
+
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'bytes': self._bytes, 'max_bytes': self.max_bytes,
+                'hit_rate': self.hits/lookups if lookups else 0.0}
+
+    def Clear(self):
+
+        for path, size, mtime in self._Entries():
+            os.remove(path)
+
+        self._index = {}
+        self._bytes = 0
+        self._written = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+def Cached_Metrics(Vertices, cache, dtype = np.float64):
+    '''Return Generate_Metrics(Vertices, dtype), looking it up in the DiskCache cache
+        first and storing it there on a miss.'''
+
+    Vertices = np.asarray(Vertices, dtype = dtype)
+    key = DiskCache.Key('Generate_Metrics', GEOMETRY_VERSION, METRIC_COLUMNS, Vertices)
+
+    metrics = cache.Get_Arrays(key)
+    if metrics is None:
+        metrics = Generate_Metrics(Vertices, dtype)
+        cache.Put_Arrays(key, metrics)
+
+    return metrics
+
+
+#Use the plain Python kernels unless GEOMETRY_BACKEND selects another backend
+#(e.g. GEOMETRY_BACKEND=numba)
+try:
+    Set_Backend(os.environ.get('GEOMETRY_BACKEND', 'python'))
+except ValueError as exception:
+    warnings.warn('%s, using the python backend' % exception)
+    Set_Backend('python')
@@ -0,0 +1,220 @@
+'''Run this script to compute triangle centers, radii and angles for large sets of
+    triangles from the command line, e.g.
+
+        python Triangle_Centers.py triangles.csv -c incenter_x incenter_y circumradius > out.csv
+
+    Every input row holds the six coordinates Ax, Ay, Bx, By, Cx, Cy of one triangle,
+    either as CSV text or as raw binary floats (or a .npy array of shape (N, 3, 2) or
+    (N, 6)). The rows are processed in fixed-size chunks with the vectorized
+    TriangleBatch engine and streamed out, so memory use stays constant however large
+    the input. The row count and throughput are reported on stderr at the end.
+
+    With --cache DIR the metrics of every chunk are kept in a DiskCache, so rerunning
+    over unchanged input (with the same chunk size) skips the computation.
+'''
+import os
+import sys
+import time
+import argparse
+from itertools import islice
+
+import numpy as np
+
+from Geometry import METRIC_COLUMNS, Generate_Metrics, DiskCache, Cached_Metrics
+
+
+def Read_CSV_Chunks(fp, chunk_size):
+    '''Yield (n, 3, 2) chunks of the triangles in the CSV text stream fp. Blank lines
+        and lines starting with # are skipped, as is a first line none of whose fields
+        is numeric (a header). Any other line that is not numeric is an error.'''
+
+    lines = (line for line in fp if line.strip() and not line.startswith('#'))
+
+    first = next(lines, None)
+    if first is None:
+        return
+    if not any(Is_Number(value) for value in first.split(',')):
+        first = None
+
+    pending = [first] if first is not None else []
+    while True:
+        pending += islice(lines, chunk_size - len(pending))
+        if not pending:
+            return
+        yield Check_Rows(np.loadtxt(pending, delimiter = ',', ndmin = 2))
+        pending = []
+
+
+def Is_Number(text):
+
+    try:
+        float(text)
+    except ValueError:
+        return False
+
+    return True
+
+
+def Check_Rows(rows):
+    '''Return the array rows of shape (n, 6) or (n, 3, 2) as an (n, 3, 2) array, raising
+        a ValueError if it has another shape.'''
+
+    if (rows.ndim == 2 and rows.shape[1] == 6) or rows.shape[1:] == (3, 2):
+        return rows.reshape(-1, 3, 2)
+
+    raise ValueError('expected 6 values (Ax, Ay, Bx, By, Cx, Cy) per triangle, got rows of shape %s' % (rows.shape[1:],))
+
+
+def Read_Binary_Chunks(fp, chunk_size, dtype):
+    '''Yield (n, 3, 2) chunks of the triangles in the binary stream fp, which holds
+        six native-endian values of dtype per triangle.'''
+
+    record = 6*dtype.itemsize
+
+    while True:
+        data = fp.read(chunk_size*record)
+        if not data:
+            return
+        if len(data) % record:
+            raise ValueError('Binary input ends in a partial row')
+        yield np.frombuffer(data, dtype = dtype).reshape(-1, 3, 2)
+
+
+def Read_NPY_Chunks(filename, chunk_size):
+    '''Yield (n, 3, 2) chunks of the memory-mapped .npy file filename.'''
+
+    Vertices = np.load(filename, mmap_mode = 'r')
+
+    for start in range(0, len(Vertices), chunk_size):
+        yield Check_Rows(np.asarray(Vertices[start:start + chunk_size]))
+
+
+def Read_Chunks(source, input_format, chunk_size, dtype):
+    '''Yield the (n, 3, 2) chunks of source, a filename or - for stdin.'''
+
+    if source.endswith('.npy'):
+        yield from Read_NPY_Chunks(source, chunk_size)
+
+    elif input_format == 'csv':
+        if source == '-':
+            yield from Read_CSV_Chunks(sys.stdin, chunk_size)
+        else:
+            with open(source) as fp:
+                yield from Read_CSV_Chunks(fp, chunk_size)
+
+    else:
+        if source == '-':
+            yield from Read_Binary_Chunks(sys.stdin.buffer, chunk_size, dtype)
+        else:
+            with open(source, 'rb') as fp:
+                yield from Read_Binary_Chunks(fp, chunk_size, dtype)
+
+
+def Process(sources, out, columns, input_format = 'csv', output_format = 'csv', chunk_size = 65536, dtype = np.float64,
+            cache = None):
+    '''Compute the metric columns (names in METRIC_COLUMNS) of every triangle of
+        sources chunk by chunk and write them to the stream out, as CSV text with a
+        header line or as raw binary rows of dtype. If cache (a DiskCache) is given
+        the metrics of each chunk are looked up there first. Returns the number of rows.'''
+
+    dtype = np.dtype(dtype)
+    rows = 0
+
+    if output_format == 'csv':
+        out.write(','.join(columns) + '\n')
+
+    for source in sources:
+        for chunk in Read_Chunks(source, input_format, chunk_size, dtype):
+            #Degenerate triangles give inf or nan radii and centers
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                if cache is not None:
+                    metrics = Cached_Metrics(chunk, cache, dtype)
+                else:
+                    metrics = Generate_Metrics(chunk, dtype)
+            table = np.stack([metrics[column] for column in columns], axis = 1)
+
+            if output_format == 'csv':
+                np.savetxt(out, table, delimiter = ',', fmt = '%.17g' if dtype == np.float64 else '%.9g')
+            else:
+                out.write(table.astype(dtype).tobytes())
+
+            rows += len(chunk)
+
+    return rows
+
+
+def Parse_Arguments(argv = None):
+
+    parser = argparse.ArgumentParser(description = 'Compute triangle centers, radii and angles in constant memory.')
+
+    parser.add_argument('inputs', nargs = '*', default = ['-'],
+                        help = 'input files, - for stdin (the default); .npy files are memory-mapped')
+    parser.add_argument('-o', '--output', default = '-', help = 'output file, - for stdout (the default)')
+    parser.add_argument('-c', '--columns', nargs = '+', default = METRIC_COLUMNS, choices = METRIC_COLUMNS,
+                        metavar = 'COLUMN', help = 'columns to compute, any of: ' + ' '.join(METRIC_COLUMNS))
+    parser.add_argument('-i', '--input-format', choices = ['csv', 'binary'], default = 'csv')
+    parser.add_argument('-f', '--output-format', choices = ['csv', 'binary'], default = 'csv')
+    parser.add_argument('-n', '--chunk-size', type = int, default = 65536, help = 'triangles per chunk')
+    parser.add_argument('-d', '--dtype', choices = ['float64', 'float32'], default = 'float64',
+                        help = 'type of the binary input, the computations and the binary output')
+    parser.add_argument('-q', '--quiet', action = 'store_true', help = 'do not report the throughput')
+    parser.add_argument('--cache', metavar = 'DIR', help = 'directory of a cache of computed chunks')
+    parser.add_argument('--cache-size', type = float, default = 1024, help = 'largest size of the cache in MB')
+    parser.add_argument('--cache-stats', action = 'store_true', help = 'report the cache hit and miss rates')
+
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    '''Run the command line tool. Returns the exit status.'''
+
+    args = Parse_Arguments(argv)
+
+    try:
+        return Run(args)
+    except (ValueError, OSError) as exception:
+        #Malformed or missing input, reported in one line as a pipeline tool should
+        print('error: %s' % exception, file = sys.stderr)
+        return 1
+
+
+def Run(args):
+
+    cache = DiskCache(args.cache, int(args.cache_size*2**20)) if args.cache else None
+
+    start = time.perf_counter()
+
+    if args.output == '-':
+        out = sys.stdout if args.output_format == 'csv' else sys.stdout.buffer
+        try:
+            rows = Process(args.inputs, out, args.columns, args.input_format, args.output_format, args.chunk_size, args.dtype,
+                           cache)
+            out.flush()
+        except BrokenPipeError:
+            #The reader went away (e.g. head), which is not an error in a pipeline
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 0
+    else:
+        with open(args.output, 'w' if args.output_format == 'csv' else 'wb') as out:
+            rows = Process(args.inputs, out, args.columns, args.input_format, args.output_format, args.chunk_size, args.dtype,
+                           cache)
+
+    elapsed = time.perf_counter() - start
+
+    if not args.quiet:
+        print('%d rows in %.3f s (%.0f rows/s)' % (rows, elapsed, rows/elapsed if elapsed > 0 else 0.0), file = sys.stderr)
+
+    if args.cache_stats and cache is not None:
+        info = cache.Info()
+        print('cache: %d hits, %d misses (%.1f%% hit rate), %d evictions, %.1f MB' %
+              (info['hits'], info['misses'], 100*info['hit_rate'], info['evictions'], info['bytes']/2**20), file = sys.stderr)
+
+    return 0
+
+
+
+
+if __name__ == '__main__':
+
+
+    sys.exit(main())
@@ -0,0 +1,359 @@
+'''Run this script to check that every way Geometry offers of computing triangle
+    centers and radii agrees with a high precision reference, and to see how fast
+    each one is, e.g.
+
+        python Triangle_Compare.py -n 2000
+
+    The triangles are random ones plus adversarial families: slivers, near-right
+    triangles, near-vertical legs and huge coordinate offsets. Each path (Triangle and
+    ScalarTriangle under every available backend, TriangleBatch in float64 and
+    float32, and the SimilarityCache) is compared with the reference, and one table
+    reports the largest error of each center and radius along with the speedup over
+    Triangle with the numpy backend on the same family.
+
+    Errors are normalized so that one budget holds across shapes and scales: center
+    errors are divided by M + L, where M is the largest vertex coordinate and L the
+    longest side, with L further divided by sin(smallest angle)**2 for the
+    circumcenter and orthocenter, and radius errors are relative errors times
+    sin(smallest angle)**2, since the area of a sliver is that sensitive to its sides. The script exits with status 1
+    if any path exceeds its budget.
+'''
+import sys
+import time
+import argparse
+from fractions import Fraction
+from decimal import Decimal, localcontext
+
+import numpy as np
+
+from Geometry import (CENTERS, Triangle, ScalarTriangle, TriangleBatch, SimilarityCache,
+                      Available_Backends, Get_Backend, Set_Backend)
+
+
+QUANTITIES = CENTERS + ['Inradius', 'Circumradius']
+
+#Largest normalized error allowed for each kind of path: the scalar kernels of
+#Triangle and ScalarTriangle, TriangleBatch in float64 and float32, and the
+#SimilarityCache, which rounds its shape key to 10**-12
+BUDGETS = {'kernels': 1e-12, 'float64': 1e-12, 'float32': 1e-4, 'similarity': 1e-7}
+
+#Looser budgets for particular families. The scalar kernels solve for the circumcenter
+#in absolute coordinates, losing about log10(M/L) digits far from the origin, and
+#intersect altitudes by their slopes, which loses more on slivers. The rounding of the
+#SimilarityCache key is magnified on slivers in the same way.
+FAMILY_BUDGETS = {('kernels', 'offset'): 1e-3, ('kernels', 'sliver'): 1e-8, ('similarity', 'sliver'): 1e-6}
+
+#In float32 the area of a triangle whose smallest angle has a sine below about
+#sqrt(unit roundoff) can round to zero, making its circumradius infinite, so such
+#triangles are left out of the float32 comparison. Likewise the SimilarityCache key
+#cannot tell slivers much thinner than its rounding from degenerate triangles.
+MIN_SINE = {'float32': 1e-3, 'similarity': 1e-5}
+
+
+def Random_Triangles(rng, n):
+
+    return rng.random((n, 3, 2))
+
+def Sliver_Triangles(rng, n):
+    '''Triangles whose third vertex lies within 1e-6 to 1e-2 of the line through the others.'''
+
+    V = rng.random((n, 3, 2))
+    AB = V[:, 1] - V[:, 0]
+    normal = np.stack([-AB[:, 1], AB[:, 0]], axis = 1)
+    t = rng.uniform(-0.5, 1.5, (n, 1))
+    height = 10**rng.uniform(-6, -2, (n, 1))
+    V[:, 2] = V[:, 0] + t*AB + height*normal
+
+    return V
+
+def Near_Right_Triangles(rng, n):
+    '''Triangles whose angle at C is within 1e-6 radians of a right angle.'''
+
+    C = rng.random((n, 2))
+    theta = rng.uniform(0, 2*np.pi, n)
+    right = theta + np.pi/2 + rng.uniform(-1e-6, 1e-6, n)
+    a, b = rng.uniform(0.1, 1, (2, n))
+
+    A = C + (a*np.stack([np.cos(theta), np.sin(theta)])).T
+    B = C + (b*np.stack([np.cos(right), np.sin(right)])).T
+
+    return np.stack([A, B, C], axis = 1)
+
+def Near_Vertical_Triangles(rng, n):
+    '''Triangles with a leg within 1e-12 to 1e-6 of vertical, where slopes blow up.'''
+
+    V = rng.random((n, 3, 2))
+    V[:, 1, 0] = V[:, 0, 0] + 10**rng.uniform(-12, -6, n)*rng.choice([-1, 1], n)
+
+    return V
+
+def Offset_Triangles(rng, n):
+    '''Random triangles moved 1e4 to 1e8 away from the origin.'''
+
+    offset = 10**rng.uniform(4, 8, (n, 1, 1))*rng.choice([-1, 1], (n, 1, 2))
+
+    return rng.random((n, 3, 2)) + offset
+
+
+GENERATORS = {'random': Random_Triangles, 'sliver': Sliver_Triangles, 'near-right': Near_Right_Triangles,
+              'near-vertical': Near_Vertical_Triangles, 'offset': Offset_Triangles}
+
+
+def Reference(A, B, C):
+    '''Return the quantities of the triangle ABC to about 40 significant digits, with
+        its longest side and the sine of its smallest angle. The rational centers are
+        computed exactly with Fractions, the rest with Decimal. Degenerate triangles
+        give None.'''
+
+    P = [(Fraction(float(v[0])), Fraction(float(v[1]))) for v in (A, B, C)]
+
+    #Exact squared sides, and 16*area**2 (Heron's formula in squared sides)
+    squared = [(P[j][0] - P[k][0])**2 + (P[j][1] - P[k][1])**2 for j, k in [(1, 2), (2, 0), (0, 1)]]
+    a2, b2, c2 = squared
+    area16 = 4*a2*b2 - (a2 + b2 - c2)**2
+
+    if area16 <= 0:
+        return None
+
+    #Circumcenter relative to A, then H = A + B + C - 2*O
+    (ax, ay), (bx, by), (cx, cy) = P
+    bx, by, cx, cy = bx - ax, by - ay, cx - ax, cy - ay
+    d = 2*(bx*cy - by*cx)
+    BB, CC = bx**2 + by**2, cx**2 + cy**2
+    O = (ax + (cy*BB - by*CC)/d, ay + (bx*CC - cx*BB)/d)
+
+    result = {'Centroid': tuple(sum(p[i] for p in P)/3 for i in range(2)),
+              'Circumcenter': O,
+              'Orthocenter': tuple(sum(p[i] for p in P) - 2*O[i] for i in range(2))}
+
+    with localcontext() as context:
+        context.prec = 40
+
+        def decimal(q):
+            return Decimal(q.numerator)/Decimal(q.denominator)
+
+        sides = [decimal(s).sqrt() for s in squared]
+        perimeter = sum(sides)
+        area = decimal(area16).sqrt()/4
+
+        result['Incenter'] = tuple(float(sum(s*decimal(p[i]) for s, p in zip(sides, P))/perimeter) for i in range(2))
+        result['Inradius'] = float(2*area/perimeter)
+        result['Circumradius'] = float(sides[0]*sides[1]*sides[2]/(4*area))
+
+        longest = max(sides)
+        others = sorted(sides)
+        sine = float(2*area/(others[1]*others[2]))
+
+    for center in ['Centroid', 'Circumcenter', 'Orthocenter']:
+        result[center] = tuple(float(value) for value in result[center])
+
+    return result, float(longest), sine
+
+
+def Reference_Values(Vertices):
+    '''Return the reference quantities of the (N, 3, 2) Vertices as arrays, the
+        normalizing scale of each quantity's error, and the sines of the smallest
+        angles. Degenerate triangles get nan.'''
+
+    values = {quantity: [] for quantity in QUANTITIES}
+    L, S = [], []
+
+    for A, B, C in Vertices:
+        reference = Reference(A, B, C)
+        if reference is None:
+            reference = {quantity: (np.nan, np.nan) if quantity in CENTERS else np.nan for quantity in QUANTITIES}, np.nan, np.nan
+        result, longest, sine = reference
+        for quantity in QUANTITIES:
+            values[quantity].append(result[quantity])
+        L.append(longest)
+        S.append(sine)
+
+    values = {quantity: np.array(value) for quantity, value in values.items()}
+    L, S = np.array(L), np.array(S)
+    M = np.abs(Vertices).max(axis = (1, 2))
+
+    scales = {'Centroid': M + L, 'Incenter': M + L,
+              'Circumcenter': M + L/S**2, 'Orthocenter': M + L/S**2,
+              'Inradius': values['Inradius']/S**2, 'Circumradius': values['Circumradius']/S**2}
+
+    return values, scales, S
+
+
+def Triangle_Path(triangle_class, backend):
+    '''Return a function evaluating the quantities one triangle_class at a time under backend.'''
+
+    def evaluate(Vertices):
+        Set_Backend(backend)
+
+        values = {quantity: [] for quantity in QUANTITIES}
+        for A, B, C in Vertices:
+            try:
+                triangle = triangle_class(A, B, C)
+                result = [getattr(triangle, 'Generate_' + center)() for center in CENTERS]
+                result += [triangle.Get_Inradius(), triangle.Get_Circumradius()]
+            except Exception:
+                #Geometry raises on (near) degenerate input; counted as an infinite error
+                result = [(np.nan, np.nan)]*len(CENTERS) + [np.nan, np.nan]
+            for quantity, value in zip(QUANTITIES, result):
+                values[quantity].append(value)
+
+        return values
+
+    return evaluate
+
+def Batch_Path(dtype):
+    '''Return a function evaluating the quantities with one TriangleBatch of dtype.'''
+
+    def evaluate(Vertices):
+        batch = TriangleBatch(Vertices, dtype = dtype)
+
+        values = {center: getattr(batch, 'Generate_' + center)() for center in CENTERS}
+        values['Inradius'] = batch.Get_Inradius()
+        values['Circumradius'] = batch.Get_Circumradius()
+
+        return values
+
+    return evaluate
+
+def Similarity_Path(Vertices):
+    '''Evaluate the centers through a SimilarityCache (it has no radii).'''
+
+    cache = SimilarityCache()
+
+    values = {center: [] for center in CENTERS}
+    for A, B, C in Vertices:
+        try:
+            centers = cache.Get_Centers(A, B, C)
+        except Exception:
+            centers = {center: (np.nan, np.nan) for center in CENTERS}
+        for center in CENTERS:
+            values[center].append(centers[center])
+
+    return values
+
+
+def Available_Paths():
+    '''Return a dictionary of (evaluate, kind) for every path, kind naming its budget
+        in BUDGETS. The first path is the baseline the speedups are measured against.'''
+
+    paths = {}
+    for backend in Available_Backends():
+        paths['Triangle[%s]' % backend] = (Triangle_Path(Triangle, backend), 'kernels')
+    for backend in Available_Backends():
+        paths['ScalarTriangle[%s]' % backend] = (Triangle_Path(ScalarTriangle, backend), 'kernels')
+
+    paths['TriangleBatch[float64]'] = (Batch_Path(np.float64), 'float64')
+    paths['TriangleBatch[float32]'] = (Batch_Path(np.float32), 'float32')
+    paths['SimilarityCache'] = (Similarity_Path, 'similarity')
+
+    return paths
+
+
+def Normalized_Errors(values, reference, scales, valid):
+    '''Return the largest normalized error of every quantity in values, over the
+        triangles where valid is True.'''
+
+    errors = {}
+    for quantity, value in values.items():
+        value = np.asarray(value, dtype = np.float64)
+        difference = np.abs(value - reference[quantity])
+        if difference.ndim == 2:
+            difference = difference.max(axis = 1)
+        #A failed evaluation is an infinite error
+        difference[np.isnan(difference)] = np.inf
+        errors[quantity] = np.max(difference[valid]/scales[quantity][valid], initial = 0.0)
+
+    return errors
+
+
+def Compare(n = 1000, seed = 0, families = None):
+    '''Compare every path on n triangles of each family of GENERATORS. Returns the
+        rows (path, family, errors, budget) and the timings in triangles per second by
+        (path, family).'''
+
+    rng = np.random.default_rng(seed)
+    families = families or list(GENERATORS)
+    paths = Available_Paths()
+
+    rows = []
+    timings = {}
+
+    with np.errstate(all = 'ignore'):
+        for family in families:
+            Vertices = GENERATORS[family](rng, n)
+
+            #float32 is compared with the triangles it can represent, its inputs
+            #rounded to float32
+            references = {'float64': Reference_Values(Vertices),
+                          'float32': Reference_Values(Vertices.astype(np.float32).astype(np.float64))}
+
+            for name, (evaluate, kind) in paths.items():
+                budget = FAMILY_BUDGETS.get((kind, family), BUDGETS[kind])
+                reference, scales, S = references['float32' if kind == 'float32' else 'float64']
+
+                #Degenerate triangles have no reference
+                valid = np.isfinite(S) & (S > MIN_SINE.get(kind, 0))
+
+                #Warm up (e.g. compile the Numba kernels) before timing
+                evaluate(Vertices[:2])
+
+                start = time.perf_counter()
+                values = evaluate(Vertices)
+                elapsed = time.perf_counter() - start
+
+                rows.append((name, family, Normalized_Errors(values, reference, scales, valid), budget))
+                timings[name, family] = n/elapsed
+
+    return rows, timings
+
+
+def Print_Table(rows, timings, out = sys.stdout):
+    '''Print one line per path and family with the largest error of every quantity, and
+        the speedup of the path over the first path on the same family. Returns whether
+        every error is within budget.'''
+
+    baseline = {}
+    for name, family in timings:
+        baseline.setdefault(family, timings[name, family])
+
+    passed = True
+
+    header = '%-24s %-14s' % ('path', 'family') + ''.join('%13s' % q for q in QUANTITIES) + '%10s %9s  %s' % ('budget', 'speedup', '')
+    print(header, file = out)
+    print('-'*len(header), file = out)
+
+    for name, family, errors, budget in rows:
+        ok = max(errors.values()) <= budget
+        passed = passed and ok
+        status = 'ok' if ok else 'FAIL'
+
+        cells = ''.join('%13.2e' % errors[q] if q in errors else '%13s' % '-' for q in QUANTITIES)
+        speedup = timings[name, family]/baseline[family]
+        print('%-24s %-14s' % (name, family) + cells + '%10.0e' % budget + ' %8.1fx  %s' % (speedup, status), file = out)
+
+    return passed
+
+
+def main(argv = None):
+
+    parser = argparse.ArgumentParser(description = 'Compare the accuracy and speed of the Geometry paths.')
+    parser.add_argument('-n', type = int, default = 1000, help = 'triangles per family')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--families', nargs = '+', choices = list(GENERATORS), help = 'families to run (all by default)')
+    args = parser.parse_args(argv)
+
+    backend = Get_Backend()
+    try:
+        rows, timings = Compare(args.n, args.seed, args.families)
+    finally:
+        Set_Backend(backend)
+
+    return 0 if Print_Table(rows, timings) else 1
+
+
+
+
+if __name__ == '__main__':
+
+
+    sys.exit(main())
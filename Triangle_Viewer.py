@@ -6,17 +6,199 @@
     Institution: USNA
     Email: nwood@usna.edu
 '''
+import time
+_import_start = time.perf_counter()
+
 from matplotlib import pyplot as plt
-from Geometry import Triangle, LineSegment
+from Geometry import CENTERS, TRIANGLE_CLASSES, GEOMETRY_VERSION, TriangleBatch, LineSegment, VertexSweep, DiskCache
 from matplotlib.widgets import Button
+from matplotlib.collections import LineCollection
+from matplotlib.transforms import AffineDeltaTransform
 import numpy as np
 import math
 from random import random
+from functools import partial
+import threading
+import io
+import os
+
+#matplotlib.animation is only needed for playback and is imported there
+
+
+#Registry of the triangle centers shown by the viewer. Each center knows its color,
+#the Triangle methods that generate its point and (optionally) its circle, and the
+#legend label used for its construction lines. The construction lines of the shown
+#centers come from one Generate_Construction_Lines call, in registry order.
+CENTER_REGISTRY = {
+    'Centroid': {'color':'b', 'point':'Generate_Centroid',
+                 'circle':None, 'label':'Median'},
+    'Incenter': {'color':'r', 'point':'Generate_Incenter',
+                 'circle':'Generate_Inscribed', 'label':'Angle\nBisector'},
+    'Circumcenter': {'color':'g', 'point':'Generate_Circumcenter',
+                     'circle':'Generate_Circumscribed', 'label':'Perpendicular\nBisector'},
+    'Orthocenter': {'color':'y', 'point':'Generate_Orthocenter',
+                    'circle':None, 'label':'Altitude'},
+    }
+
+#What each draw flag shows: the number of construction lines, whether the center
+#point is drawn, and whether the center's circle (if it has one) is drawn.
+#0 -> No draw, 1 -> Draw 1 line, 2 Draw center and lines, 3 -> Draw center only
+CENTER_MODES = {
+    0: {'lines':0, 'point':False, 'circle':False},
+    1: {'lines':1, 'point':False, 'circle':False},
+    2: {'lines':3, 'point':True, 'circle':True},
+    3: {'lines':0, 'point':True, 'circle':False},
+    }
+
+#Version of the figures drawn by the viewer, part of the Render_Triangle cache key
+#with Geometry.GEOMETRY_VERSION. Bump it whenever the drawing changes.
+RENDER_VERSION = 1
+
+
+class LocusTrail:
+
+    '''A bounded trail of points drawn as a single Line2D. The points live in a
+        preallocated ring buffer of length max_length. Every point is written twice,
+        at i and i + max_length, so the newest max_length points are always available
+        in order as one contiguous slice and adding a point does no Python work per
+        point. Line2D.set_data keeps its own copies of the x and y it is given, so the
+        trail is still copied once per point added (about max_length floats).'''
+
+    def __init__(self, line, max_length):
+        '''line is the Line2D the trail is drawn with.'''
+
+        self.line = line
+        self.max_length = max_length
+        self._buffer = np.empty((2*max_length, 2))
+        self.Clear()
+
+    def Clear(self):
+        '''Forget every point of the trail.'''
+
+        self._start = 0
+        self._count = 0
+        self.line.set_data([], [])
+
+    def Append(self, x, y):
+        '''Add the point (x, y) to the trail, dropping the oldest point if it is full.'''
+
+        n = self.max_length
+        i = (self._start + self._count) % n
+
+        self._buffer[i] = x, y
+        self._buffer[i + n] = x, y
+
+        if self._count < n:
+            self._count += 1
+        else:
+            self._start = (self._start + 1) % n
+
+        points = self._buffer[self._start:self._start + self._count]
+        self.line.set_data(points[:, 0], points[:, 1])
+
+
+def Evaluate_Geometry(triangle, request):
+    '''Evaluate request on triangle. request is the name of a Triangle method, or a
+        tuple of the name and the arguments of the method.'''
+
+    if isinstance(request, str):
+        return getattr(triangle, request)()
+
+    method, *args = request
+
+    return getattr(triangle, method)(*args)
+
+
+class GeometryWorker:
+
+    '''Computes triangle geometry on a background thread. Only the latest request is
+        kept: submitting a new request before the worker picks up the previous one
+        replaces it, so the worker never falls behind the mouse. Finished results are
+        collected with Take_Result, which is meant to be polled from the GUI thread.
+        A request that raises (e.g. a degenerate triangle) gives a result whose
+        triangle is None and whose geometry is the exception, and the worker carries on.'''
+
+    def __init__(self, triangle_class):
+        '''triangle_class is the class the triangles are built with (see TRIANGLE_CLASSES).'''
+
+        self.triangle_class = triangle_class
+
+        self._condition = threading.Condition()
+        self._request = None
+        self._result = None
+        self._running = True
+
+        self._thread = threading.Thread(target = self._Run, daemon = True)
+        self._thread.start()
+
+    def Submit(self, request_id, vertices, methods):
+        '''Ask for the Triangle methods in methods (see Evaluate_Geometry) to be evaluated
+            on the triangle with the given vertices, replacing any request not yet started.'''
+
+        with self._condition:
+            self._request = (request_id, vertices, methods)
+            self._condition.notify()
+
+    def Take_Result(self):
+        '''Return the latest finished (request_id, triangle, geometry), or None.
+            triangle is None if the request failed, with the exception as geometry.'''
+
+        with self._condition:
+            result = self._result
+            self._result = None
+
+        return result
+
+    def Stop(self):
+
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+    def _Run(self):
+
+        while True:
+            with self._condition:
+                while self._request is None and self._running:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                request_id, vertices, methods = self._request
+                self._request = None
+
+            A, B, C = vertices
+            try:
+                triangle = self.triangle_class(A, B, C)
+                geometry = {method: Evaluate_Geometry(triangle, method) for method in methods}
+            except Exception as exception:
+                triangle, geometry = None, exception
+
+            with self._condition:
+                self._result = (request_id, triangle, geometry)
 
 
 class TriangleViewer:
 
-    def __init__(self):
+    def __init__(self, show = True, locus_length = 500, background = False, poll_interval = 15, report_startup = False,
+                 representation = 'scalar', heatmap = None):
+        '''If show is False the figure is built but plt.show() is not called, which
+            is useful for scripted playback and saving animations. locus_length is
+            the maximum number of points kept in each center's locus trail.
+
+            If background is True the geometry of a dragged triangle is computed on a
+            worker thread and applied every poll_interval milliseconds, so dragging
+            stays responsive when the geometry takes longer than a frame.
+
+            The time from importing this module to the end of the first paint is
+            stored in startup_time (None until then), and printed if report_startup
+            is True.
+
+            representation selects the Geometry triangle class of TRIANGLE_CLASSES used
+            for the per-frame geometry. The default 'scalar' works on plain floats and
+            gives the same results as 'numpy', the original Triangle.
+
+            heatmap names a quantity of Geometry.SWEEP_QUANTITIES to show behind the
+            triangle from the start (see Show_Heatmap).'''
 
         #Store the index of the vertex we are clicked on
         #initially None
@@ -26,6 +208,32 @@ class TriangleViewer:
         #from the click in order for it to register
         self.epsilon = 0.1
 
+        #The class every triangle is built with
+        self.triangle_class = TRIANGLE_CLASSES[representation]
+
+        #Every new triangle gets a new version. Geometry generated for the current
+        #version is cached so redrawing an unchanged triangle costs nothing.
+        self.triangle_version = 0
+        self._geometry_version = None
+        self._geometry_cache = {}
+
+        #Locus tracing is off until the Trace button is clicked
+        self.locus_length = locus_length
+        self.trace_loci = False
+
+        #Background computation of the dragged triangle's geometry. Requests are
+        #numbered, and a result is only applied if it is newer than the last one.
+        self.background = background
+        self._request_counter = 0
+        self._applied_request = 0
+        self._latest_vertices = None
+        self.geometry_worker = GeometryWorker(self.triangle_class) if background else None
+
+        #The parameter-space heatmap is off until Show_Heatmap is called
+        self.heatmap = None
+        self.heatmap_image = None
+        self.vertex_sweep = VertexSweep()
+
         #Initialize the figure
         self.Initialize_Figure()
 
@@ -44,8 +252,36 @@ class TriangleViewer:
         #Create Reset button
         self.Create_Reset_Button()
 
+        #Create locus trace button
+        self.Create_Trace_Button()
+
+        #Poll for geometry computed in the background
+        if background:
+            self.Start_Background_Polling(poll_interval)
+
+        if heatmap is not None:
+            self.Show_Heatmap(heatmap)
+
+        #Time from the start of the imports to the end of the first paint. draw_idle
+        #only schedules the paint on interactive backends, so the time is taken when
+        #the canvas reports it has drawn.
+        self.startup_time = None
+        self._report_startup = report_startup
+        self._startup_callback = self.fig.canvas.mpl_connect('draw_event', self.first_draw_callback)
+        self.fig.canvas.draw_idle()
+
         #Show the triangle
-        plt.show()
+        if show:
+            plt.show()
+
+
+    def first_draw_callback(self, event):
+
+        self.fig.canvas.mpl_disconnect(self._startup_callback)
+
+        self.startup_time = time.perf_counter() - _import_start
+        if self._report_startup:
+            print('Startup time: %.3f s' % self.startup_time)
 
 
     def Initialize_Figure(self):
@@ -102,7 +338,8 @@ class TriangleViewer:
         A = np.array([0.25, 0.25])
         B = np.array([0.5, math.sqrt(0.5**2 - 0.25**2) + 0.25])
         C = np.array([0.75, 0.25])
-        triangle = Triangle(A, B, C)
+        triangle = self.triangle_class(A, B, C)
+        self.Set_Triangle(triangle)
 
 
         ax = self.triangle_axis
@@ -112,9 +349,42 @@ class TriangleViewer:
         X, Y = triangle.Generate_Triangle()
         triangle_lines = ax.plot(X, Y, 'k', linewidth = self._triangle_linewidth, zorder = 3)
 
-        #Add axis, and triangle to the TriangleViewer
+        #Add the triangle lines to the TriangleViewer
         self.triangle_lines = triangle_lines
+
+
+    def Set_Triangle(self, triangle):
+        '''Replace the current triangle, invalidating any geometry cached for the old one.'''
+
         self.triangle = triangle
+        self.triangle_version += 1
+
+        #Geometry still being computed for earlier vertices is now stale
+        self._latest_vertices = triangle.Vertices
+        self._applied_request = self._request_counter
+
+
+    def Get_Geometry(self, method):
+        '''Return the result of the Triangle method for the current triangle (see
+            Evaluate_Geometry), computing it only once per triangle version.'''
+
+        if self._geometry_version != self.triangle_version:
+            self._geometry_cache = {}
+            self._geometry_version = self.triangle_version
+
+        cache = self._geometry_cache
+        if method not in cache:
+            cache[method] = Evaluate_Geometry(self.triangle, method)
+
+        return cache[method]
+
+    def Construction_Lines_Request(self):
+        '''Return the Generate_Construction_Lines request (see Evaluate_Geometry) of
+            the centers whose construction lines are shown, or None if there are none.'''
+
+        centers = tuple(center for center in self.centers if CENTER_MODES[self.center_draw_flags[center]]['lines'] > 0)
+
+        return ('Generate_Construction_Lines', centers) if centers else None
 
     def Draw_Centers(self):
 
@@ -123,7 +393,7 @@ class TriangleViewer:
 
 
         #Determines the colors of the centers/lines to be drawn
-        centercolors = {'Centroid':'b', 'Incenter':'r', 'Circumcenter':'g', 'Orthocenter':'y'}
+        centercolors = {center:CENTER_REGISTRY[center]['color'] for center in CENTER_REGISTRY}
 
         centers = centercolors.keys()
 
@@ -131,19 +401,48 @@ class TriangleViewer:
         #Initially set all to zero
         center_draw_flags = {center:0 for center in centers}
 
-        #Create axes for centers and lines
-        center_lines = {center: [ax.plot([], [], centercolors[center], linestyle = '--', linewidth = self._center_linewidth, zorder = 2) for i in range(3)] for center in centers}
-        center_points = {center: ax.plot([], [], centercolors[center] + 'o', markersize = self._center_size, markeredgecolor = 'k', zorder = 2) for center in centers}
-
-
-        self.inscribed = ax.plot([], [], centercolors['Incenter'], linestyle = '-', linewidth = self._center_linewidth, zorder = 2)
-        self.circumscribed = ax.plot([], [], centercolors['Circumcenter'], linestyle = '-', linewidth = self._center_linewidth, zorder = 2)
-        self.center_lines = center_lines
-        self.center_points = center_points
+        #The artists for the centers, lines, circles and locus trails are created by
+        #Create_Center_Artists, Update_Construction_Lines and Create_Locus_Trails the
+        #first time they are needed, since every center starts hidden. All construction
+        #lines share one LineCollection; center_legend_lines only carry the legend entries.
+        self.construction_lines = None
+        self.center_legend_lines = {}
+        self.center_points = {}
+        self.center_circles = {}
+        self.locus_trails = {}
         self.center_draw_flags = center_draw_flags
         self.centers = centers
 
 
+    def Create_Center_Artists(self, center):
+        '''Create the legend line, point and circle (if any) of center.'''
+
+        ax = self.triangle_axis
+        spec = CENTER_REGISTRY[center]
+        color = spec['color']
+
+        self.center_legend_lines[center] = ax.plot([], [], color, linestyle = '--', linewidth = self._center_linewidth, zorder = 2)
+        self.center_points[center] = ax.plot([], [], color + 'o', markersize = self._center_size, markeredgecolor = 'k', zorder = 2)
+
+        if spec['circle'] is not None:
+            self.center_circles[center] = ax.plot([], [], color, linestyle = '-', linewidth = self._center_linewidth, zorder = 2)
+
+        if center == 'Incenter':
+            self.inscribed = self.center_circles[center]
+        elif center == 'Circumcenter':
+            self.circumscribed = self.center_circles[center]
+
+
+    def Create_Locus_Trails(self):
+        '''Create one trail per center for tracing loci.'''
+
+        ax = self.triangle_axis
+
+        for center in self.centers:
+            line, = ax.plot([], [], CENTER_REGISTRY[center]['color'], linestyle = ':', linewidth = self._center_linewidth, zorder = 2)
+            self.locus_trails[center] = LocusTrail(line, self.locus_length)
+
+
     def Create_Center_Buttons(self):
 
         centers = self.centers
@@ -158,18 +457,7 @@ class TriangleViewer:
 
         for button in buttons:
             center = button.label.get_text()
-
-            if center == 'Centroid':
-                button.on_clicked(self.centroid_button_click)
-
-            elif center == 'Incenter':
-                button.on_clicked(self.incenter_button_click)
-
-            elif center == 'Circumcenter':
-                button.on_clicked(self.circumcenter_button_click)
-
-            elif center == 'Orthocenter':
-                button.on_clicked(self.orthocenter_button_click)
+            button.on_clicked(partial(self.center_button_click, center))
 
         for button in buttons:
             button.label.set_fontsize(14)
@@ -189,36 +477,12 @@ class TriangleViewer:
         self.reset_button = reset_button
 
     def reset_button_click(self, event):
-        
-        ax = self.triangle_axis
-
-        [inscribed] = self.inscribed
-        [circumscribed] = self.circumscribed
-
-        inscribed.set_xdata([])
-        inscribed.set_ydata([])
-        circumscribed.set_xdata([])
-        circumscribed.set_ydata([])
-
-
-        centers = self.centers
-
-        center_draw_flags = {center:0 for center in centers}
 
-        Center_Lines = self.center_lines
-        Center_Points = self.center_points
-
-        for center in centers:
-            [center_point] = Center_Points[center]
-            center_point.set_xdata([])
-            center_point.set_ydata([])
-            center_point.set_label('')
-
-            for [center_lines] in Center_Lines[center]:
-                center_lines.set_xdata([])
-                center_lines.set_ydata([])
-                center_lines.set_label('')
-            
+        #Clear every center before the triangle is replaced
+        for center in self.centers:
+            self.center_draw_flags[center] = 0
+            self.Apply_Center_Mode(center)
+        self.Update_Construction_Lines()
 
         [triangle_lines] = self.triangle_lines
         triangle_lines.set_xdata([])
@@ -226,13 +490,11 @@ class TriangleViewer:
 
         self.Draw_Triangle()
 
+        self.Clear_Loci()
 
-        self.center_draw_flags = center_draw_flags
+        self.Update_Heatmap()
 
-        try:
-            ax.get_legend().remove()
-        except AttributeError:
-            pass
+        self.Update_Legend()
 
 
 
@@ -248,6 +510,33 @@ class TriangleViewer:
         self.randomize_button = randomize_button
 
 
+    def Create_Trace_Button(self):
+
+        fig = self.fig
+        ax = fig.add_axes([0.1, 0.20, 0.125, 0.075])
+        trace_button = Button(ax, 'Trace')
+        trace_button.label.set_fontsize(20)
+
+        trace_button.on_clicked(self.trace_button_click)
+
+        self.trace_button = trace_button
+
+
+    def trace_button_click(self, event):
+        '''Toggle tracing the loci of the centers while a vertex is dragged.'''
+
+        self.trace_loci = not self.trace_loci
+
+        if not self.locus_trails:
+            self.Create_Locus_Trails()
+
+        if self.trace_loci:
+            self.trace_button.label.set_text('Stop Trace')
+        else:
+            self.trace_button.label.set_text('Trace')
+            self.Clear_Loci()
+
+
     def random_button_click(self, event):
 
         A = np.array([random(), random()])
@@ -256,7 +545,10 @@ class TriangleViewer:
 
 
 
-        self.triangle = Triangle(A, B, C)
+        self.Set_Triangle(self.triangle_class(A, B, C))
+
+        #The loci of a jump are meaningless
+        self.Clear_Loci()
 
         #Update the triangle
         self.Update_Triangle()
@@ -265,544 +557,689 @@ class TriangleViewer:
         self.Update_Centers()
 
 
-    def centroid_button_click(self, event):
+    def Set_Center_Modes(self, center_draw_flags):
+        '''Set the draw flags of the centers in the dictionary center_draw_flags (see
+            CENTER_MODES) and redraw them.'''
 
-        triangle = self.triangle
-        ax = self.triangle_axis
+        for center, flag in center_draw_flags.items():
+            self.center_draw_flags[center] = flag
+            self.Apply_Center_Mode(center)
 
-        center_lines = self.center_lines['Centroid']
-        [center_point] = self.center_points['Centroid']
+        self.Update_Construction_Lines()
+        self.Update_Legend()
 
-        center_draw_flags = self.center_draw_flags
 
-        center_draw_flags['Centroid'] = (center_draw_flags['Centroid'] + 1) % 4
+    def center_button_click(self, center, event):
+        '''Advance the draw flag of center to its next mode and redraw it.'''
 
-        #0 -> No draw, 1 -> Draw 1 line, 2 Draw center and lines, 3 -> Draw center only
-        if center_draw_flags['Centroid'] == 0:
-            for [center_line] in center_lines:
-                center_line.set_xdata([])
-                center_line.set_ydata([])
-            center_point.set_xdata([])
-            center_point.set_ydata([])
-            center_point.set_label('')
+        center_draw_flags = self.center_draw_flags
 
-            handles, labels = ax.get_legend_handles_labels()
+        center_draw_flags[center] = (center_draw_flags[center] + 1) % len(CENTER_MODES)
 
-            if len(labels) > 0:
-                ax.legend(bbox_to_anchor=(1.45, 1.00), fontsize = 18)
-            else:
-                ax.get_legend().remove()
+        self.Apply_Center_Mode(center)
+        self.Update_Construction_Lines()
+        self.Update_Legend()
 
-        elif center_draw_flags['Centroid'] == 1:
-            
-            X, Y = triangle.Generate_Medians()
-            for x, y, [center_line] in zip(X, Y, center_lines):
-                center_line.set_xdata([x])
-                center_line.set_ydata([y])
-                center_line.set_label('Median')
-                #Only draw the first
-                break
-            
-            ax.legend(bbox_to_anchor=(1.45, 1.00), fontsize = 18)
-            
-            
 
-        elif center_draw_flags['Centroid'] == 2:
+    def mouse_click_callback(self, event):
+        '''Whenever the mouse is clicked.'''
 
-            x, y = triangle.Generate_Centroid()
-            center_point.set_xdata([x])
-            center_point.set_ydata([y])
-            center_point.set_label('Centroid')
+        #If the click did not occur within the axis, who cares
+        if event.inaxes is None:
+            return
 
-            X, Y = triangle.Generate_Medians()
+        #If button is not a left click (I think)
+        elif event.button != 1:
+            return
 
-            for x, y, [center_line] in zip(X, Y, center_lines):
-                center_line.set_xdata([x])
-                center_line.set_ydata([y])
+        else:
+            self.vind = self.get_ind_under_point(event)
 
 
-            ax.legend(bbox_to_anchor=(1.45, 1.00), fontsize = 18)
+    def mouse_release_callback(self, event):
+        '''When the mouse is released, reset vind to None'''
 
-        elif center_draw_flags['Centroid'] == 3:
+        #This only happens on left clicks
+        if event.button != 1:
+            return
+        else:
+            self.vind = None
 
 
-            for [center_line] in center_lines:
-                center_line.set_xdata([])
-                center_line.set_ydata([])
-                center_line.set_label('')
-            ax.legend(bbox_to_anchor=(1.45, 1.00), fontsize = 18)
+    def get_ind_under_point(self, event):
 
+        ax = self.triangle_axis
 
+        #Need to convert event.x and event.y coordinates (which are in strange coordinates)
+        #to the local coordinates
+        t = ax.transData.inverted()
+        tinv = ax.transData
+        click_coords = t.transform([event.x,event.y])
 
+        #Grab the vertices of the triangle
+        vertices = self.triangle.Vertices
 
-    def incenter_button_click(self, event):
+        #Create three line segments, connecting the click_coords to each vertex and find the
+        #length of each line
+        d = [LineSegment(v, click_coords).Length() for v in vertices]
 
-        triangle = self.triangle
-        ax = self.triangle_axis
+        #Find the index of the vertex whose distance to the mouse click point is smallest
+        ind = d.index(min(d))
 
-        [inscribed] = self.inscribed
 
-        center_draw_flags = self.center_draw_flags
+        #If the distance between the vertex and the mouse click is less than epsilon,
+        #then update the vind attribute accordingly. Otherwise update it to None.
+        if d[ind] <= self.epsilon:
+            return ind
 
-        center_lines = self.center_lines['Incenter']
-        [center_point] = self.center_points['Incenter']
+        else:
+            return None
 
-        center_draw_flags['Incenter'] = (center_draw_flags['Incenter'] + 1) % 4
 
-        #0 -> No draw, 1 -> Draw 1 line, 2 Draw center and lines, 3 -> Draw center only
-        if center_draw_flags['Incenter'] == 0:
-            for [center_line] in center_lines:
-                center_line.set_xdata([])
-                center_line.set_ydata([])
-            center_point.set_xdata([])
-            center_point.set_ydata([])
-            center_point.set_label('')
 
-            handles, labels = ax.get_legend_handles_labels()
+    def mouse_movement_callback(self, event):
+        '''When the mouse moves'''
 
-            if len(labels) > 0:
-                ax.legend(bbox_to_anchor=(1.45, 1.00), fontsize = 18)
-            else:
-                ax.get_legend().remove()
+        #The mouse movement only can only have an effect if the button is clicked
+        #inside the axis and vind != None
+        vind = self.vind
+        if vind is None or event.button != 1 or event.inaxes is None:
+            return
 
-        elif center_draw_flags['Incenter'] == 1:
+        else:
 
-            X, Y = triangle.Generate_AngleBisectors()
-            for x, y, [center_line] in zip(X, Y, center_lines):
-                center_line.set_xdata([x])
-                center_line.set_ydata([y])
-                center_line.set_label('Angle\nBisector')
-                break
-            ax.legend(bbox_to_anchor=(1.45, 1.00), fontsize = 18)
-            
+            ax = self.triangle_axis
+            fig = self.fig
 
-        elif center_draw_flags['Incenter'] == 2:
+            t = ax.transData.inverted()
+            tinv = ax.transData
+            x, y = t.transform([event.x,event.y])
 
-            x, y = triangle.Generate_Incenter()
-            center_point.set_xdata([x])
-            center_point.set_ydata([y])
-            center_point.set_label('Incenter')
 
-            X, Y = triangle.Generate_AngleBisectors()
-            for x, y, [center_line] in zip(X, Y, center_lines):
-                center_line.set_xdata([x])
-                center_line.set_ydata([y])
+            vertices = list(self._latest_vertices)
+            vertices[vind] = np.array([x, y])
 
-            x, y = triangle.Generate_Inscribed()
-            inscribed.set_xdata([x])
-            inscribed.set_ydata([y])
-                
+            if self.background:
+                #Move the triangle now and let the worker catch up with the centers
+                self.Request_Geometry(vertices)
+                return
 
-            ax.legend(bbox_to_anchor=(1.45, 1.00), fontsize = 18)
+            A, B, C = vertices
+            self.Set_Triangle(self.triangle_class(A, B, C))
 
-        elif center_draw_flags['Incenter'] == 3:
+            #Update the triangle
+            self.Update_Triangle()
 
+            #Update the centers
+            self.Update_Centers()
 
-            for [center_line] in center_lines:
-                center_line.set_xdata([])
-                center_line.set_ydata([])
-                center_line.set_label('')
+            #Extend the loci of the centers
+            self.Update_Loci()
 
-            inscribed.set_xdata([])
-            inscribed.set_ydata([])
+            fig.canvas.draw_idle()
 
-            ax.legend(bbox_to_anchor=(1.45, 1.00), fontsize = 18)
 
+    def Required_Geometry(self):
+        '''Return the Triangle methods needed to draw the current flags (see Evaluate_Geometry).'''
 
+        methods = ['Generate_Triangle']
 
-    def circumcenter_button_click(self, event):
+        lines = self.Construction_Lines_Request()
+        if lines is not None:
+            methods.append(lines)
 
-        triangle = self.triangle
-        ax = self.triangle_axis
+        for center in self.centers:
+            spec = CENTER_REGISTRY[center]
+            mode = CENTER_MODES[self.center_draw_flags[center]]
 
-        [circumscribed] = self.circumscribed
+            if mode['point'] or self.trace_loci:
+                methods.append(spec['point'])
+            if mode['circle'] and spec['circle'] is not None:
+                methods.append(spec['circle'])
 
-        center_draw_flags = self.center_draw_flags
+        return methods
 
-        center_lines = self.center_lines['Circumcenter']
-        [center_point] = self.center_points['Circumcenter']
 
-        center_draw_flags['Circumcenter'] = (center_draw_flags['Circumcenter'] + 1) % 4
+    def Request_Geometry(self, vertices):
+        '''Hand the geometry of the triangle with the given vertices to the worker,
+            and move the triangle outline immediately.'''
 
-        #0 -> No draw, 1 -> Draw 1 line, 2 Draw center and lines, 3 -> Draw center only
-        if center_draw_flags['Circumcenter'] == 0:
-            for [center_line] in center_lines:
-                center_line.set_xdata([])
-                center_line.set_ydata([])
-            center_point.set_xdata([])
-            center_point.set_ydata([])
-            center_point.set_label('')
+        self._request_counter += 1
+        self._latest_vertices = vertices
+        self.geometry_worker.Submit(self._request_counter, vertices, self.Required_Geometry())
 
-            handles, labels = ax.get_legend_handles_labels()
+        [line] = self.triangle_lines
+        X = [v[0] for v in vertices + [vertices[0]]]
+        Y = [v[1] for v in vertices + [vertices[0]]]
+        line.set_xdata(X)
+        line.set_ydata(Y)
 
-            if len(labels) > 0:
-                ax.legend(bbox_to_anchor=(1.45, 1.00), fontsize = 18)
-            else:
-                ax.get_legend().remove()
+        self.fig.canvas.draw_idle()
 
-        elif center_draw_flags['Circumcenter'] == 1:
 
-            X, Y = triangle.Generate_PerpendicularBisectors()
-            for x, y, [center_line] in zip(X, Y, center_lines):
-                center_line.set_xdata([x])
-                center_line.set_ydata([y])
-                center_line.set_label('Perpendicular\nBisector')
-                break
-            ax.legend(bbox_to_anchor=(1.45, 1.00), fontsize = 18)
-            
+    def Apply_Background_Results(self):
+        '''Apply the latest geometry computed by the worker, if it is not stale.
+            Called on the GUI thread by the polling timer.'''
 
-        elif center_draw_flags['Circumcenter'] == 2:
+        result = self.geometry_worker.Take_Result()
+        if result is None:
+            return
 
-            x, y = triangle.Generate_Circumcenter()
-            center_point.set_xdata([x])
-            center_point.set_ydata([y])
-            center_point.set_label('Circumcenter')
+        request_id, triangle, geometry = result
+        if request_id <= self._applied_request:
+            return
 
-            X, Y = triangle.Generate_PerpendicularBisectors()
-            for x, y, [center_line] in zip(X, Y, center_lines):
-                center_line.set_xdata([x])
-                center_line.set_ydata([y])
+        self._applied_request = request_id
 
-            x, y = triangle.Generate_Circumscribed()
-            circumscribed.set_xdata([x])
-            circumscribed.set_ydata([y])
-                
+        #The triangle has no geometry (e.g. it is degenerate), keep showing the last one
+        if triangle is None:
+            return
 
-            ax.legend(bbox_to_anchor=(1.45, 1.00), fontsize = 18)
+        #Install the triangle along with its precomputed geometry
+        self.triangle = triangle
+        self.triangle_version += 1
+        self._geometry_version = self.triangle_version
+        self._geometry_cache = geometry
 
-        elif center_draw_flags['Circumcenter'] == 3:
+        self.Update_Triangle()
+        self.Update_Centers()
+        self.Update_Loci()
 
+        self.fig.canvas.draw_idle()
 
-            for [center_line] in center_lines:
-                center_line.set_xdata([])
-                center_line.set_ydata([])
-                center_line.set_label('')
 
-            circumscribed.set_xdata([])
-            circumscribed.set_ydata([])
-            
-            ax.legend(bbox_to_anchor=(1.45, 1.00), fontsize = 18)
+    def Start_Background_Polling(self, poll_interval):
 
+        timer = self.fig.canvas.new_timer(interval = poll_interval)
+        timer.add_callback(self.Apply_Background_Results)
+        timer.start()
 
+        #Stop the worker with the figure
+        self.fig.canvas.mpl_connect('close_event', lambda event: self.geometry_worker.Stop())
 
+        self.background_timer = timer
 
-    def orthocenter_button_click(self, event):
 
-        triangle = self.triangle
+    def Update_Triangle(self, vertices = None):
+        '''Redraw the triangle outline and the heatmap. vertices are those of the
+            triangle being shown if it is not self.triangle, as during playback.'''
+
         ax = self.triangle_axis
+        [line] = self.triangle_lines
+        triangle = self.triangle
 
-        center_draw_flags = self.center_draw_flags
+        X, Y = self.Get_Geometry('Generate_Triangle')
+        line.set_xdata(X)
+        line.set_ydata(Y)
 
-        center_lines = self.center_lines['Orthocenter']
-        [center_point] = self.center_points['Orthocenter']
+        self.Update_Heatmap(vertices)
 
-        center_draw_flags['Orthocenter'] = (center_draw_flags['Orthocenter'] + 1) % 4
 
+    def Show_Heatmap(self, quantity, vertex = 2, resolution = 512, cmap = 'viridis'):
+        '''Show quantity (a name in Geometry.SWEEP_QUANTITIES) as an image behind the
+            triangle. The value at each point is that of the triangle whose vertex (0, 1
+            or 2) is moved there while the other two stay put. resolution is the rough
+            number of pixels across the view; the image follows panning and zooming.'''
 
-        #0 -> No draw, 1 -> Draw 1 line, 2 Draw center and lines, 3 -> Draw center only
-        if center_draw_flags['Orthocenter'] == 0:
-            for [center_line] in center_lines:
-                center_line.set_xdata([])
-                center_line.set_ydata([])
-            center_point.set_xdata([])
-            center_point.set_ydata([])
-            center_point.set_label('')
+        self.heatmap = {'quantity': quantity, 'vertex': vertex, 'resolution': resolution}
 
-            handles, labels = ax.get_legend_handles_labels()
+        if self.heatmap_image is None:
+            ax = self.triangle_axis
+            self.heatmap_image = ax.imshow(np.zeros((1, 1)), origin = 'lower', interpolation = 'nearest',
+                                           cmap = cmap, zorder = 0)
+            ax.callbacks.connect('xlim_changed', lambda ax: self.Update_Heatmap())
+            ax.callbacks.connect('ylim_changed', lambda ax: self.Update_Heatmap())
+        else:
+            self.heatmap_image.set_cmap(cmap)
 
-            if len(labels) > 0:
-                ax.legend(bbox_to_anchor=(1.45, 1.00), fontsize = 18)
-            else:
-                ax.get_legend().remove()
+        self.Update_Heatmap()
+        self.fig.canvas.draw_idle()
 
 
-        elif center_draw_flags['Orthocenter'] == 1:
+    def Hide_Heatmap(self):
 
-            X, Y = triangle.Generate_Altitudes()
-            for x, y, [center_line] in zip(X, Y, center_lines):
-                center_line.set_xdata([x])
-                center_line.set_ydata([y])
-                center_line.set_label('Altitude')
-                break
-            ax.legend(bbox_to_anchor=(1.45, 1.00), fontsize = 18)
-            
+        self.heatmap = None
 
-        elif center_draw_flags['Orthocenter'] == 2:
+        if self.heatmap_image is not None:
+            self.heatmap_image.set_visible(False)
+            self.fig.canvas.draw_idle()
 
-            x, y = triangle.Generate_Orthocenter()
-            center_point.set_xdata([x])
-            center_point.set_ydata([y])
-            center_point.set_label('Orthocenter')
 
-            X, Y = triangle.Generate_Altitudes()
-            for x, y, [center_line] in zip(X, Y, center_lines):
-                center_line.set_xdata([x])
-                center_line.set_ydata([y])
-                
+    def Update_Heatmap(self, vertices = None):
+        '''Redraw the heatmap for the current triangle, or the triangle with the given
+            vertices, and view. Only the tiles that are not cached by the VertexSweep
+            are computed.'''
 
-            ax.legend(bbox_to_anchor=(1.45, 1.00), fontsize = 18)
+        heatmap = self.heatmap
+        if heatmap is None:
+            return
+
+        if vertices is None:
+            vertices = self.triangle.Vertices
 
-        elif center_draw_flags['Orthocenter'] == 3:
+        ax = self.triangle_axis
+        image, extent = self.vertex_sweep.Render(vertices, heatmap['vertex'], heatmap['quantity'],
+                                                 ax.get_xlim(), ax.get_ylim(), heatmap['resolution'])
 
+        #Degenerate triangles blow up some quantities, so scale the colors to the bulk
+        finite = image[np.isfinite(image)]
+        if finite.size > 0:
+            low, high = np.percentile(finite, [2, 98])
+            self.heatmap_image.set_clim(low, high if high > low else low + 1)
 
-            for [center_line] in center_lines:
-                center_line.set_xdata([])
-                center_line.set_ydata([])
-                center_line.set_label('')
+        self.heatmap_image.set_data(image)
+        self.heatmap_image.set_extent(extent)
+        self.heatmap_image.set_visible(True)
 
-            ax.legend(bbox_to_anchor=(1.45, 1.00), fontsize = 18)
 
-        
+    def Update_Centers(self):
 
+        for center in self.centers:
+            if self.center_draw_flags[center] != 0:
+                self.Apply_Center_Mode(center)
 
-    def mouse_click_callback(self, event):
-        '''Whenever the mouse is clicked.'''
+        self.Update_Construction_Lines()
 
-        #If the click did not occur within the axis, who cares
-        if event.inaxes is None:
-            return
 
-        #If button is not a left click (I think)
-        elif event.button != 1:
+    def Update_Loci(self):
+        '''Add the current position of every center to its locus trail.'''
+
+        if not self.trace_loci:
             return
 
+        for center in self.centers:
+            x, y = self.Get_Geometry(CENTER_REGISTRY[center]['point'])
+            self.locus_trails[center].Append(x, y)
+
+
+    def Clear_Loci(self):
+
+        for trail in self.locus_trails.values():
+            trail.Clear()
+
+
+    def Apply_Center_Mode(self, center):
+        '''Set the artists of center to match its draw flag for the current triangle.'''
+
+        spec = CENTER_REGISTRY[center]
+        mode = CENTER_MODES[self.center_draw_flags[center]]
+
+        if center not in self.center_points:
+            if self.center_draw_flags[center] == 0:
+                #Never drawn, nothing to clear
+                return
+            self.Create_Center_Artists(center)
+
+        [legend_line] = self.center_legend_lines[center]
+        [center_point] = self.center_points[center]
+
+        #The construction lines themselves are drawn by Update_Construction_Lines
+        legend_line.set_label(spec['label'] if mode['lines'] > 0 else '')
+
+        #The center itself
+        if mode['point']:
+            x, y = self.Get_Geometry(spec['point'])
+            center_point.set_xdata([x])
+            center_point.set_ydata([y])
+            center_point.set_label(center)
         else:
-            self.vind = self.get_ind_under_point(event)
+            center_point.set_xdata([])
+            center_point.set_ydata([])
+            center_point.set_label('')
 
+        #The inscribed/circumscribed circle
+        if spec['circle'] is not None:
+            [circle] = self.center_circles[center]
+            if mode['circle']:
+                X, Y = self.Get_Geometry(spec['circle'])
+                circle.set_xdata(X)
+                circle.set_ydata(Y)
+            else:
+                circle.set_xdata([])
+                circle.set_ydata([])
 
-    def mouse_release_callback(self, event):
-        '''When the mouse is released, reset vind to None'''
 
-        #This only happens on left clicks
-        if event.button != 1:
+    def Update_Construction_Lines(self):
+        '''Draw the construction lines of every center, as selected by the draw flags,
+            from one batched Generate_Construction_Lines array in a single LineCollection.'''
+
+        n_lines = [CENTER_MODES[self.center_draw_flags[center]]['lines'] for center in self.centers]
+
+        if self.construction_lines is None:
+            if sum(n_lines) == 0:
+                #Never drawn, nothing to clear
+                return
+            self.construction_lines = LineCollection([], linestyles = '--', linewidths = self._center_linewidth, zorder = 2)
+            self.triangle_axis.add_collection(self.construction_lines, autolim = False)
+
+        if sum(n_lines) == 0:
+            self.construction_lines.set_segments([])
             return
-        else:
-            self.vind = None
 
+        #(center, line, endpoint, coordinate) of the centers with lines, in registry order
+        lines = self.Get_Geometry(self.Construction_Lines_Request())
 
-    def get_ind_under_point(self, event):
+        segments = np.concatenate([lines[k, :n] for k, n in enumerate(n for n in n_lines if n > 0)])
+        colors = [CENTER_REGISTRY[center]['color'] for center, n in zip(self.centers, n_lines) for i in range(n)]
+
+        self.construction_lines.set_segments(segments)
+        self.construction_lines.set_color(colors)
+
+
+    def Update_Legend(self):
+        '''Show the legend if any artist is labelled, otherwise remove it.'''
 
         ax = self.triangle_axis
 
-        #Need to convert event.x and event.y coordinates (which are in strange coordinates)
-        #to the local coordinates
-        t = ax.transData.inverted()
-        tinv = ax.transData
-        click_coords = t.transform([event.x,event.y])
+        handles, labels = ax.get_legend_handles_labels()
 
-        #Grab the vertices of the triangle
-        vertices = self.triangle.Vertices
+        if len(labels) > 0:
+            ax.legend(bbox_to_anchor=(1.45, 1.00), fontsize = 18)
+        else:
+            try:
+                ax.get_legend().remove()
+            except AttributeError:
+                pass
 
-        #Create three line segments, connecting the click_coords to each vertex and find the
-        #length of each line
-        d = [LineSegment(v, click_coords).Length() for v in vertices]
+    def Precompute_Frames(self, vertices):
+        '''Compute the triangle outline and every center, construction line and circle
+            for a family of triangles in one batched pass. vertices has shape (N, 3, 2).'''
 
-        #Find the index of the vertex whose distance to the mouse click point is smallest
-        ind = d.index(min(d))
+        batch = TriangleBatch(vertices)
 
+        methods = ['Generate_Triangle', 'Generate_Construction_Lines']
+        for spec in CENTER_REGISTRY.values():
+            methods.append(spec['point'])
+            if spec['circle'] is not None:
+                methods.append(spec['circle'])
 
-        #If the distance between the vertex and the mouse click is less than epsilon,
-        #then update the vind attribute accordingly. Otherwise update it to None.
-        if d[ind] <= self.epsilon:
-            return ind
+        frames = {method: getattr(batch, method)() for method in methods}
+        frames['Vertices'] = batch.Vertices
 
-        else:
-            return None
+        return frames
 
 
+    def Show_Frame(self, frames, i):
+        '''Install frame i of precomputed frames as the current geometry and update
+            the artists. Returns the updated artists for blitting.'''
 
-    def mouse_movement_callback(self, event):
-        '''When the mouse moves'''
+        geometry = {}
+        for method, values in frames.items():
+            value = values[i]
+            if value.ndim == 1:
+                #Center point
+                geometry[method] = (value[0], value[1])
+            elif value.ndim == 2:
+                #Triangle outline or circle
+                geometry[method] = (value[:, 0], value[:, 1])
+            else:
+                #Construction lines of every center, keep those of the shown centers
+                request = self.Construction_Lines_Request()
+                if request is not None:
+                    geometry[request] = value[[CENTERS.index(center) for center in request[1]]]
+
+        #A new triangle version whose geometry is already known
+        self.triangle_version += 1
+        self._geometry_version = self.triangle_version
+        self._geometry_cache = geometry
+
+        #self.triangle is already the last frame, the heatmap follows the frame shown
+        self.Update_Triangle(frames['Vertices'][i])
+        self.Update_Centers()
 
-        #The mouse movement only can only have an effect if the button is clicked
-        #inside the axis and vind != None
-        vind = self.vind
-        if vind is None or event.button != 1 or event.inaxes is None:
-            return
+        artists = list(self.triangle_lines)
+        if self.heatmap is not None:
+            artists.append(self.heatmap_image)
+        if self.construction_lines is not None:
+            artists.append(self.construction_lines)
+        for center in self.center_points:
+            artists += self.center_points[center]
+        for circle in self.center_circles.values():
+            artists += circle
+        for trail in self.locus_trails.values():
+            artists.append(trail.line)
 
-        else:
+        return artists
 
-            ax = self.triangle_axis
-            fig = self.fig
 
-            t = ax.transData.inverted()
-            tinv = ax.transData
-            x, y = t.transform([event.x,event.y])
+    def Play_Trajectory(self, vertices, fps = 30, repeat = True, filename = None):
+        '''Play back a family of triangles, given as an (N, 3, 2) array of vertices, at
+            a fixed frame rate. All geometry is precomputed up front and the frames are
+            drawn with blitting. The centers are drawn according to center_draw_flags.
+            A heatmap, if shown, is rendered for the triangle of every frame, which limits
+            the frame rate unless only the heatmap's own vertex moves (its tiles are then
+            cached).
 
+            If filename is given the animation is also written to it, as a GIF if it ends
+            in .gif and as a video through ffmpeg otherwise (e.g. .mp4).'''
 
-            vertices = self.triangle.Vertices
-            vertices[vind] = np.array([x, y])
-            A, B, C = vertices
-            self.triangle = Triangle(A, B, C)
+        from matplotlib.animation import FuncAnimation, PillowWriter, FFMpegWriter
 
-            #Update the triangle
-            self.Update_Triangle()
+        frames = self.Precompute_Frames(vertices)
 
-            #Update the centers
-            self.Update_Centers()
+        #Interaction after playback continues from the last triangle
+        A, B, C = frames['Vertices'][-1]
+        self.Set_Triangle(self.triangle_class(A, B, C))
 
-            fig.canvas.draw_idle()
+        animation = FuncAnimation(self.fig, partial(self.Show_Frame, frames), frames = len(frames['Vertices']),
+                                  interval = 1000/fps, blit = True, repeat = repeat)
 
+        if filename is not None:
+            if filename.lower().endswith('.gif'):
+                writer = PillowWriter(fps = fps)
+            else:
+                writer = FFMpegWriter(fps = fps)
 
-    def Update_Triangle(self):
+            animation.save(filename, writer = writer)
 
-        ax = self.triangle_axis
-        [line] = self.triangle_lines
-        triangle = self.triangle
+        #Keep a reference, otherwise the animation is garbage collected
+        self.animation = animation
 
-        X, Y = triangle.Generate_Triangle()
-        line.set_xdata(X)
-        line.set_ydata(Y)
+        return animation
 
 
+    def Play_Vertex_Path(self, vind, path, fps = 30, repeat = True, filename = None):
+        '''Play back the current triangle with vertex vind moved along path, an
+            (N, 2) array of positions. See Play_Trajectory.'''
 
-    def Update_Centers(self):
+        path = np.asarray(path, dtype = float)
 
-        triangle = self.triangle
-        [inscribed] = self.inscribed
-        [circumscribed] = self.circumscribed
+        vertices = np.repeat(np.array(self.triangle.Vertices, dtype = float)[None], len(path), axis = 0)
+        vertices[:, vind] = path
 
-        center_draw_flags = self.center_draw_flags
+        return self.Play_Trajectory(vertices, fps = fps, repeat = repeat, filename = filename)
+
+
+def Render_Triangle(vertices, filename, center_draw_flags = None, heatmap = None, dpi = 100, cache = None):
+    '''Render the viewer figure of the triangle with the (3, 2) vertices to filename
+        without showing it, the format following the extension of filename.
+        center_draw_flags maps centers to draw flags (see CENTER_MODES), and heatmap
+        names a quantity to show behind the triangle (see Show_Heatmap).
+
+        If cache (a Geometry.DiskCache) already holds a render of the same vertices,
+        flags and settings, it is written out without building a figure at all.
+        Returns True if the render came from the cache.'''
+
+    vertices = np.array(vertices, dtype = float)
 
-        Center_Lines = self.center_lines
-        Center_Point = self.center_points
+    #Every center is spelled out, so flags that render the same image share a key
+    center_draw_flags = center_draw_flags or {}
+    unknown = set(center_draw_flags) - set(CENTER_REGISTRY)
+    if unknown:
+        raise ValueError('Unknown centers %s, expected some of %s' % (sorted(unknown), list(CENTER_REGISTRY)))
+    center_draw_flags = {center: center_draw_flags.get(center, 0) for center in CENTER_REGISTRY}
+    image_format = os.path.splitext(filename)[1][1:].lower() or 'png'
 
-        for center in Center_Lines:
-            [center_point] = Center_Point[center]
-            center_lines = Center_Lines[center]
+    if cache is not None:
+        key = DiskCache.Key('Render_Triangle', RENDER_VERSION, GEOMETRY_VERSION, vertices, center_draw_flags, heatmap,
+                            dpi, image_format, plt.matplotlib.__version__)
+        data = cache.Get(key)
+        if data is not None:
+            with open(filename, 'wb') as fp:
+                fp.write(data)
+            return True
 
-            if center_draw_flags[center] == 1:
+    viewer = TriangleViewer(show = False, heatmap = heatmap)
+    try:
+        A, B, C = vertices
+        viewer.Set_Triangle(viewer.triangle_class(A, B, C))
+        viewer.Update_Triangle()
+        viewer.Set_Center_Modes(center_draw_flags)
 
-                #Update both the lines and the center
-                if center == 'Centroid':
+        buffer = io.BytesIO()
+        viewer.fig.savefig(buffer, format = image_format, dpi = dpi)
+    finally:
+        plt.close(viewer.fig)
 
-                    X, Y = triangle.Generate_Medians()
-                    for x, y, [center_line] in zip(X, Y, center_lines):
-                        center_line.set_xdata([x])
-                        center_line.set_ydata([y])
-                        break
+    data = buffer.getvalue()
+    with open(filename, 'wb') as fp:
+        fp.write(data)
 
-                elif center == 'Incenter':
+    if cache is not None:
+        cache.Put(key, data)
 
-                    X, Y = triangle.Generate_AngleBisectors()
-                    for x, y, [center_line] in zip(X, Y, center_lines):
-                        center_line.set_xdata([x])
-                        center_line.set_ydata([y])
-                        break
+    return False
 
-                elif center == 'Circumcenter':
 
-                    X, Y = triangle.Generate_PerpendicularBisectors()
-                    for x, y, [center_line] in zip(X, Y, center_lines):
-                        center_line.set_xdata([x])
-                        center_line.set_ydata([y])
-                        break
+class TriangleGrid:
 
-                elif center == 'Orthocenter':
+    '''Draws N triangles and their centers as small multiples, tiled in a grid inside a
+        single axes. Each triangle is scaled to fit its unit tile (together with any
+        circle that is drawn), all the geometry is computed with one TriangleBatch, and
+        the tiles are placed through the offsets of a few shared collections (outlines,
+        construction lines, circles and center points), so a 20x20 grid is drawn with
+        a handful of draw calls instead of one figure per triangle.'''
 
+    def __init__(self, vertices, center_draw_flags = None, ncols = None, show = True, tile_size = 1.5, margin = 0.08):
+        '''vertices is an (N, 3, 2) array of triangles and center_draw_flags maps centers
+            to the draw flags (see CENTER_MODES) used in every tile. ncols is the number
+            of columns, about sqrt(N) by default. Every tile is tile_size inches wide,
+            and margin is the fraction of a tile kept free on each side.'''
 
-                    X, Y = triangle.Generate_Altitudes()
-                    for x, y, [center_line] in zip(X, Y, center_lines):
-                        center_line.set_xdata([x])
-                        center_line.set_ydata([y])
-                        break
+        vertices = np.asarray(vertices, dtype = float)
 
-                
-            elif center_draw_flags[center] == 2:
-                
-                #Update both the lines and the center
-                if center == 'Centroid':
+        self.center_draw_flags = {center:0 for center in CENTER_REGISTRY}
+        self.center_draw_flags.update(center_draw_flags or {})
+        self.margin = margin
 
-                    x, y = triangle.Generate_Centroid()
-                    center_point.set_xdata([x])
-                    center_point.set_ydata([y])
+        self.ncols = ncols or max(1, math.ceil(math.sqrt(len(vertices))))
+        self.nrows = max(1, math.ceil(len(vertices)/self.ncols))
 
-                    X, Y = triangle.Generate_Medians()
-                    for x, y, [center_line] in zip(X, Y, center_lines):
-                        center_line.set_xdata([x])
-                        center_line.set_ydata([y])
+        self.Initialize_Figure(tile_size)
+        self.Draw_Tiles(vertices)
 
-                elif center == 'Incenter':
+        if show:
+            plt.show()
 
-                    x, y = triangle.Generate_Incenter()
-                    center_point.set_xdata([x])
-                    center_point.set_ydata([y])
 
-                    X, Y = triangle.Generate_AngleBisectors()
-                    for x, y, [center_line] in zip(X, Y, center_lines):
-                        center_line.set_xdata([x])
-                        center_line.set_ydata([y])
+    def Initialize_Figure(self, tile_size):
+
+        fig = plt.figure(figsize = (self.ncols*tile_size, self.nrows*tile_size))
+
+        #One axes for every tile, with one unit per tile
+        ax = fig.add_axes([0, 0, 1, 1])
+        ax.set_aspect('equal')
+        ax.set_xlim([0, self.ncols])
+        ax.set_ylim([0, self.nrows])
+        ax.set_axis_off()
+
+        self.fig = fig
+        self.ax = ax
 
-                    x, y = triangle.Generate_Inscribed()
-                    inscribed.set_xdata([x])
-                    inscribed.set_ydata([y])
 
-                elif center == 'Circumcenter':
+    def Fit_Tiles(self, vertices):
+        '''Return the vertices moved and scaled so that every triangle, with the center
+            points and circles that are drawn, is centered in the unit square inside
+            the margin.'''
 
-                    x, y = triangle.Generate_Circumcenter()
-                    center_point.set_xdata([x])
-                    center_point.set_ydata([y])
+        batch = TriangleBatch(vertices)
 
-                    X, Y = triangle.Generate_PerpendicularBisectors()
-                    for x, y, [center_line] in zip(X, Y, center_lines):
-                        center_line.set_xdata([x])
-                        center_line.set_ydata([y])
+        points = [vertices]
+        for center, spec in CENTER_REGISTRY.items():
+            mode = CENTER_MODES[self.center_draw_flags[center]]
+            if mode['point']:
+                points.append(getattr(batch, spec['point'])()[:, None, :])
+            if spec['circle'] is not None and mode['circle']:
+                points.append(getattr(batch, spec['circle'])())
+        points = np.concatenate(points, axis = 1)
 
-                    x, y = triangle.Generate_Circumscribed()
-                    circumscribed.set_xdata([x])
-                    circumscribed.set_ydata([y])
+        low = points.min(axis = 1)
+        high = points.max(axis = 1)
+        extent = (high - low).max(axis = 1)
 
-                elif center == 'Orthocenter':
+        #Degenerate triangles are left unscaled
+        scale = (1 - 2*self.margin)/np.where(extent > 0, extent, 1)
 
-                    x, y = triangle.Generate_Orthocenter()
-                    center_point.set_xdata([x])
-                    center_point.set_ydata([y])
+        return (vertices - ((low + high)/2)[:, None, :])*scale[:, None, None] + 0.5
 
-                    X, Y = triangle.Generate_Altitudes()
-                    for x, y, [center_line] in zip(X, Y, center_lines):
-                        center_line.set_xdata([x])
-                        center_line.set_ydata([y])
 
+    def Add_Lines(self, segments, offsets, colors, linestyle, linewidth, zorder):
+        '''Add a LineCollection of segments given relative to their tile, each shifted
+            by its offset (the origin of its tile) in data coordinates.'''
 
-            elif center_draw_flags[center] == 3:
+        ax = self.ax
 
-                #Update only the center
-                if center == 'Centroid':
+        #The segments are drawn as displacements from their transformed offsets
+        collection = LineCollection(segments, offsets = offsets, offset_transform = ax.transData,
+                                    transform = AffineDeltaTransform(ax.transData),
+                                    colors = colors, linestyles = linestyle, linewidths = linewidth, zorder = zorder)
+        ax.add_collection(collection, autolim = False)
 
-                    x, y = triangle.Generate_Centroid()
-                    center_point.set_xdata([x])
-                    center_point.set_ydata([y])
+        return collection
 
 
-                elif center == 'Incenter':
+    def Draw_Tiles(self, vertices):
 
-                    x, y = triangle.Generate_Incenter()
-                    center_point.set_xdata([x])
-                    center_point.set_ydata([y])
+        ax = self.ax
+        flags = self.center_draw_flags
+        n = len(vertices)
 
+        batch = TriangleBatch(self.Fit_Tiles(vertices))
 
-                elif center == 'Circumcenter':
+        #Lower left corner of every tile, filled row by row from the top
+        k = np.arange(n)
+        origins = np.stack([k % self.ncols, self.nrows - 1 - k//self.ncols], axis = 1).astype(float)
 
-                    x, y = triangle.Generate_Circumcenter()
-                    center_point.set_xdata([x])
-                    center_point.set_ydata([y])
+        self.triangle_lines = self.Add_Lines(batch.Generate_Triangle(), origins, 'k', '-', 1.5, 3)
 
+        #Construction lines, the same number per triangle
+        n_lines = {center: CENTER_MODES[flags[center]]['lines'] for center in CENTER_REGISTRY}
+        n_lines = {center: count for center, count in n_lines.items() if count > 0}
+        self.construction_lines = None
+        if n_lines:
+            lines = batch.Generate_Construction_Lines(list(n_lines))
+            segments = np.concatenate([lines[:, i, :count] for i, count in enumerate(n_lines.values())], axis = 1)
+            colors = [CENTER_REGISTRY[center]['color'] for center, count in n_lines.items() for j in range(count)]
+            self.construction_lines = self.Add_Lines(segments.reshape(-1, 2, 2), np.repeat(origins, sum(n_lines.values()), axis = 0),
+                                                     colors*n, '--', 0.8, 2)
 
-                elif center == 'Orthocenter':
+        #Circles, each triangle's circles in registry order
+        circles = [(getattr(batch, spec['circle'])(), spec['color']) for center, spec in CENTER_REGISTRY.items()
+                   if spec['circle'] is not None and CENTER_MODES[flags[center]]['circle']]
+        self.center_circles = None
+        if circles:
+            curves = np.stack([curve for curve, color in circles], axis = 1)
+            self.center_circles = self.Add_Lines(curves.reshape(-1, curves.shape[2], 2), np.repeat(origins, len(circles), axis = 0),
+                                                 [color for curve, color in circles]*n, '-', 0.8, 2)
 
-                    x, y = triangle.Generate_Orthocenter()
-                    center_point.set_xdata([x])
-                    center_point.set_ydata([y])
+        #Center points, placed directly at their offsets
+        points = [(getattr(batch, spec['point'])(), spec['color']) for center, spec in CENTER_REGISTRY.items()
+                  if CENTER_MODES[flags[center]]['point']]
+        self.center_points = None
+        if points:
+            P = np.concatenate([P + origins for P, color in points])
+            colors = np.repeat([color for P, color in points], n)
+            self.center_points = ax.scatter(P[:, 0], P[:, 1], s = 12, c = list(colors), edgecolors = 'k', linewidths = 0.3, zorder = 4)
 
 
+    def Save(self, filename, dpi = 100):
 
-                    
+        self.fig.savefig(filename, dpi = dpi)
 
-            
 
 
 
 if __name__ == '__main__':
 
 
-    TV = TriangleViewer()
+    TV = TriangleViewer(report_startup = True)
@@ -0,0 +1,91 @@
+'''Checks the selection of the single triangle backends, and that the kernels of
+    every backend agree with the original NumPy code.'''
+import os
+import sys
+import subprocess
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import Geometry
+from Geometry import Triangle, ScalarTriangle, Available_Backends, Get_Backend, Set_Backend
+
+METHODS = ['Generate_Centroid', 'Generate_Incenter', 'Generate_Circumcenter', 'Generate_Orthocenter',
+           'Generate_Medians', 'Generate_PerpendicularBisectors', 'Generate_AngleBisectors', 'Generate_Altitudes',
+           'Get_Inradius', 'Get_Circumradius']
+
+
+def Results(triangle):
+
+    return [np.array(triangle.Sides, dtype = float), np.array(triangle.Angles, dtype = float)] + \
+           [np.array(getattr(triangle, method)(), dtype = float) for method in METHODS]
+
+
+def Random_Vertices(n = 200, seed = 0):
+
+    return np.random.default_rng(seed).random((n, 3, 2))
+
+
+def test_backend_selection():
+
+    backend = Get_Backend()
+    try:
+        assert Available_Backends()[:2] == ['numpy', 'python']
+
+        for name in Available_Backends():
+            Set_Backend(name)
+            assert Get_Backend() == name
+
+        try:
+            Set_Backend('fortran')
+        except ValueError:
+            pass
+        else:
+            assert False, 'an unknown backend was accepted'
+    finally:
+        Set_Backend(backend)
+
+
+def test_bad_environment_falls_back():
+
+    env = dict(os.environ, GEOMETRY_BACKEND = 'fortran')
+    process = subprocess.run([sys.executable, '-c', 'import Geometry; print(Geometry.Get_Backend())'], cwd = ROOT,
+                             env = env, capture_output = True, text = True, check = True)
+
+    assert process.stdout.strip() == 'python'
+    assert 'fortran' in process.stderr
+
+
+def test_kernels_match_numpy():
+
+    backend = Get_Backend()
+    try:
+        Set_Backend('numpy')
+        expected = [Results(Triangle(*vertices)) for vertices in Random_Vertices()]
+
+        for name in Available_Backends()[1:]:
+            Set_Backend(name)
+            for vertices, values in zip(Random_Vertices(), expected):
+                for triangle in [Triangle(*vertices), ScalarTriangle(*vertices)]:
+                    for value, reference in zip(Results(triangle), values):
+                        np.testing.assert_allclose(value, reference, rtol = 1e-9, atol = 1e-12)
+    finally:
+        Set_Backend(backend)
+
+
+def test_scalar_identical_across_backends():
+
+    backend = Get_Backend()
+    try:
+        Set_Backend('python')
+        expected = [Results(Triangle(*vertices)) for vertices in Random_Vertices(seed = 1)]
+
+        for name in Available_Backends()[1:]:
+            Set_Backend(name)
+            for vertices, values in zip(Random_Vertices(seed = 1), expected):
+                for value, reference in zip(Results(ScalarTriangle(*vertices)), values):
+                    assert np.array_equal(value, reference), name
+    finally:
+        Set_Backend(backend)
@@ -0,0 +1,49 @@
+'''Checks the filtered Centers_Coincide predicates against the exact ones, on nearly
+    equilateral triangles far from the origin and tolerances around their actual
+    center distances.'''
+import os
+import sys
+import math
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Geometry import Triangle, ScalarTriangle, TriangleBatch
+
+#The viewer's starting triangle
+EQUILATERAL = np.array([[0.25, 0.25], [0.5, math.sqrt(0.1875) + 0.25], [0.75, 0.25]])
+
+OFFSETS = [0.0, 1e4, 1e6, 1e7]
+
+
+def Nearly_Equilateral(rng, n, offset):
+
+    return EQUILATERAL + offset + rng.normal(scale = 1e-6, size = (n, 3, 2))*rng.choice([0, 1], size = (n, 1, 1))
+
+
+def test_equilateral_offsets():
+
+    for offset in OFFSETS:
+        A, B, C = EQUILATERAL + offset
+        eps = 1e-9 if offset < 1e7 else 1e-5
+
+        assert Triangle(A, B, C, exact = True).Centers_Coincide(eps)
+        assert Triangle(A, B, C).Centers_Coincide(eps)
+        assert ScalarTriangle(A, B, C).Centers_Coincide(eps)
+        assert TriangleBatch([[A, B, C]]).Centers_Coincide(eps).all()
+
+
+def test_filter_matches_exact():
+
+    rng = np.random.default_rng(0)
+
+    for offset in OFFSETS:
+        Vertices = Nearly_Equilateral(rng, 50, offset)
+
+        for eps in [1e-12, 1e-9, 1e-7, 1e-6, 1e-5, 1e-3]:
+            exact = [Triangle(*vertices, exact = True).Centers_Coincide(eps) for vertices in Vertices]
+
+            assert [Triangle(*vertices).Centers_Coincide(eps) for vertices in Vertices] == exact
+            assert [ScalarTriangle(*vertices).Centers_Coincide(eps) for vertices in Vertices] == exact
+            assert TriangleBatch(Vertices).Centers_Coincide(eps).tolist() == exact
@@ -0,0 +1,48 @@
+'''Checks that the single triangle construction lines match TriangleBatch, and that
+    a wrongly shaped out array is refused.'''
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Geometry import CENTERS, Triangle, ScalarTriangle, TriangleBatch
+
+
+def test_lines_match_batch():
+
+    Vertices = np.random.default_rng(0).random((200, 3, 2))
+    expected = TriangleBatch(Vertices).Generate_Construction_Lines()
+
+    for triangle_class in [Triangle, ScalarTriangle]:
+        lines = np.stack([triangle_class(*vertices).Generate_Construction_Lines() for vertices in Vertices])
+        np.testing.assert_allclose(lines, expected, rtol = 0, atol = 1e-10)
+
+        #Any subset of the centers, in the order given
+        centers = ['Orthocenter', 'Centroid']
+        lines = np.stack([triangle_class(*vertices).Generate_Construction_Lines(centers) for vertices in Vertices])
+        np.testing.assert_allclose(lines, expected[:, [CENTERS.index(center) for center in centers]], rtol = 0, atol = 1e-10)
+
+
+def test_out():
+
+    triangle = ScalarTriangle((0, 0), (1, 0), (0, 1))
+
+    out = np.zeros((2, 3, 2, 2))
+    assert triangle.Generate_Construction_Lines(['Centroid', 'Incenter'], out = out) is out
+
+    for bad in [np.zeros((4, 3, 2, 2)), np.zeros((2, 3, 2, 2), dtype = int)]:
+        try:
+            triangle.Generate_Construction_Lines(['Centroid', 'Incenter'], out = bad)
+        except ValueError:
+            pass
+        else:
+            assert False, 'out of shape %s and type %s was accepted' % (bad.shape, bad.dtype)
+
+
+def test_collinear_without_circumcenter():
+
+    lines = Triangle(np.array([0.0, 0.0]), np.array([1.0, 0.0]), np.array([2.0, 0.0])).Generate_Construction_Lines(['Centroid'])
+
+    assert np.isfinite(lines).all()
@@ -0,0 +1,69 @@
+'''Checks that DiskCache keeps a directory shared by several caches within its
+    budget, and that cached results are keyed by the version of the code.'''
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import Geometry
+from Geometry import DiskCache, Cached_Metrics
+
+
+def Directory_Bytes(directory):
+
+    return sum(os.path.getsize(os.path.join(root, name)) for root, directories, files in os.walk(directory)
+               for name in files)
+
+
+def test_shared_directory_budget(tmp_path):
+
+    #Two caches on one directory stand for two processes
+    first = DiskCache(str(tmp_path), max_bytes = 64*1024)
+    second = DiskCache(str(tmp_path), max_bytes = 64*1024)
+
+    for n in range(200):
+        cache = first if n % 2 else second
+        cache.Put(DiskCache.Key('entry', n), bytes(1024))
+
+        #Each cache may overshoot by its rescan_bytes before it sees the other's entries
+        assert Directory_Bytes(str(tmp_path)) <= first.max_bytes + first.rescan_bytes + second.rescan_bytes
+
+    #The newest entries survive, whichever cache wrote them
+    assert first.Get(DiskCache.Key('entry', 199)) is not None
+    assert first.Get(DiskCache.Key('entry', 198)) is not None
+    assert first.Get(DiskCache.Key('entry', 0)) is None
+
+
+def test_other_process_entries_evicted(tmp_path):
+
+    #Entries another process writes after the cache is opened count once it stores
+    #rescan_bytes, here on every store
+    cache = DiskCache(str(tmp_path), max_bytes = 16*1024, rescan_bytes = 0)
+
+    other = DiskCache(str(tmp_path))
+    for n in range(32):
+        other.Put(DiskCache.Key('other', n), bytes(1024))
+
+    cache.Put(DiskCache.Key('own'), bytes(1024))
+
+    assert Directory_Bytes(str(tmp_path)) <= 16*1024
+    assert cache.Get(DiskCache.Key('own')) is not None
+    assert cache.Info()['bytes'] == Directory_Bytes(str(tmp_path))
+
+
+def test_cached_metrics_version(tmp_path, monkeypatch):
+
+    cache = DiskCache(str(tmp_path))
+    Vertices = np.random.default_rng(0).random((10, 3, 2))
+
+    Cached_Metrics(Vertices, cache)
+    Cached_Metrics(Vertices, cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    #Entries of another version of the code are not used
+    monkeypatch.setattr(Geometry, 'GEOMETRY_VERSION', Geometry.GEOMETRY_VERSION + 1)
+    Cached_Metrics(Vertices, cache)
+    assert (cache.hits, cache.misses) == (1, 2)
@@ -0,0 +1,102 @@
+'''Compares the centers of random triangles computed by TriangleBatch in float32 and
+    float64 with a 50 digit reference, against the error bounds documented in the
+    TriangleBatch docstring.'''
+import os
+import sys
+from decimal import Decimal, localcontext
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Geometry import CENTERS, TriangleBatch
+
+#The "a few" of the documented bounds
+FEW = 4
+
+
+def Reference_Centers(vertices):
+    '''Return the (x, y) centers of the triangle with the (3, 2) vertices, in CENTERS
+        order, computed with 50 digit Decimals.'''
+
+    with localcontext() as context:
+        context.prec = 50
+
+        (ax, ay), (bx, by), (cx, cy) = [(Decimal(float(x)), Decimal(float(y))) for x, y in vertices]
+
+        a = ((bx - cx)**2 + (by - cy)**2).sqrt()
+        b = ((cx - ax)**2 + (cy - ay)**2).sqrt()
+        c = ((ax - bx)**2 + (ay - by)**2).sqrt()
+        p = a + b + c
+
+        #Circumcenter relative to A, and the orthocenter from H = A + B + C - 2*O
+        Bx, By, Cx, Cy = bx - ax, by - ay, cx - ax, cy - ay
+        d = 2*(Bx*Cy - By*Cx)
+        ox = ax + (Cy*(Bx**2 + By**2) - By*(Cx**2 + Cy**2))/d
+        oy = ay + (Bx*(Cx**2 + Cy**2) - Cx*(Bx**2 + By**2))/d
+
+        centers = [((ax + bx + cx)/3, (ay + by + cy)/3),
+                   ((a*ax + b*bx + c*cx)/p, (a*ay + b*by + c*cy)/p),
+                   (ox, oy),
+                   (ax + bx + cx - 2*ox, ay + by + cy - 2*oy)]
+
+        return np.array([[float(x), float(y)] for x, y in centers])
+
+
+def Error_Bounds(Vertices, dtype):
+    '''Return the (N, 4) documented error bounds of the centers in CENTERS order.'''
+
+    u = np.finfo(dtype).eps/2
+
+    V = Vertices.astype(np.float64)
+    legs = np.roll(V, -2, axis = 1) - np.roll(V, -1, axis = 1)
+    S = np.sort(np.einsum('nij,nij->ni', legs, legs), axis = 1)
+    B = V[:, 1] - V[:, 0]
+    C = V[:, 2] - V[:, 0]
+
+    M = np.abs(V).max(axis = (1, 2))
+    L = np.sqrt(S[:, 2])
+    #The smallest angle is opposite the shortest side
+    sine = np.abs(B[:, 0]*C[:, 1] - B[:, 1]*C[:, 0])/np.sqrt(S[:, 1]*S[:, 2])
+
+    return FEW*u*np.stack([M, M + L, L/sine**2 + M, L/sine**2 + M], axis = 1)
+
+
+def Random_Triangles(n, seed = 0):
+
+    #Representable in float32, so both precisions compute the same triangles
+    return np.random.default_rng(seed).uniform(-10, 10, (n, 3, 2)).astype(np.float32).astype(np.float64)
+
+
+def test_centers_within_bounds():
+
+    Vertices = Random_Triangles(2000)
+    reference = np.stack([Reference_Centers(vertices) for vertices in Vertices])
+
+    for dtype in [np.float64, np.float32]:
+        batch = TriangleBatch(Vertices, dtype)
+        bounds = Error_Bounds(Vertices, dtype)
+
+        for k, center in enumerate(CENTERS):
+            computed = getattr(batch, 'Generate_' + center)()
+            assert computed.dtype == dtype
+
+            error = np.abs(computed.astype(np.float64) - reference[:, k]).max(axis = 1)
+            worst = np.argmax(error/bounds[:, k])
+
+            assert np.all(error <= bounds[:, k]), '%s %s error %.3g over the bound %.3g' % \
+                (np.dtype(dtype).name, center, error[worst], bounds[worst, k])
+
+
+def test_float32_matches_float64():
+
+    Vertices = Random_Triangles(2000, seed = 1)
+    batch32 = TriangleBatch(Vertices, np.float32)
+    batch64 = TriangleBatch(Vertices, np.float64)
+    bounds = Error_Bounds(Vertices, np.float32) + Error_Bounds(Vertices, np.float64)
+
+    for k, center in enumerate(CENTERS):
+        method = 'Generate_' + center
+        difference = np.abs(getattr(batch32, method)() - getattr(batch64, method)()).max(axis = 1)
+
+        assert np.all(difference <= bounds[:, k]), '%s differs by up to %.3g' % (center, difference.max())
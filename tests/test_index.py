@@ -0,0 +1,69 @@
+'''Checks the TriangleIndex queries against brute force over every triangle.'''
+import os
+import sys
+import itertools
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Geometry import CENTERS, TriangleBatch, TriangleIndex
+
+
+def Test_Vertices(n = 3000, seed = 0):
+    '''Return (n, 3, 2) vertices: random triangles, near-equilateral and near-right
+        isosceles ones, and slivers, at random positions, scales and rotations.'''
+
+    rng = np.random.default_rng(seed)
+    m = n//4
+
+    equilateral = np.array([[0, 0], [1, 0], [0.5, np.sqrt(3)/2]])
+    right = np.array([[0, 0], [1, 0], [0, 1.]])
+    shapes = np.concatenate([rng.random((m, 3, 2)),
+                             equilateral + rng.normal(0, 0.01, (m, 3, 2)),
+                             right + rng.normal(0, 0.01, (m, 3, 2)),
+                             np.array([[0, 0], [1, 0], [0.5, 0]]) + rng.normal(0, 1e-3, (n - 3*m, 3, 2))])
+
+    theta = rng.uniform(0, 2*np.pi, n)
+    rotation = np.stack([np.stack([np.cos(theta), -np.sin(theta)], -1), np.stack([np.sin(theta), np.cos(theta)], -1)], -2)
+    scale = 10**rng.uniform(-2, 2, n)
+
+    return np.einsum('nij,nkj->nki', rotation, shapes)*scale[:, None, None] + rng.uniform(-100, 100, (n, 1, 2))
+
+
+@pytest.fixture(scope = 'module')
+def index():
+
+    return TriangleIndex(Test_Vertices())
+
+
+@pytest.mark.parametrize('center1, center2', list(itertools.combinations(CENTERS, 2)))
+def test_query_centers_within(index, center1, center2):
+
+    batch = TriangleBatch(index.Vertices)
+    distances = np.linalg.norm(getattr(batch, 'Generate_' + center1)() - getattr(batch, 'Generate_' + center2)(), axis = 1)
+
+    for epsilon in [0, 1e-6, 1e-3, 1e-2, 0.1, 1, 10]:
+        rows = index.Query_Centers_Within(center1, center2, epsilon)
+        np.testing.assert_array_equal(rows, np.flatnonzero(distances <= epsilon), err_msg = 'epsilon %g' % epsilon)
+
+
+def test_query_angles(index):
+
+    for angles in [(60, 60, 60), (90, 45, 45), (45, 90, 45), (30, 60, 90), (0.5, 1, 178.5), (20, 70.25, 89.75)]:
+        for tolerance in [0, 0.1, 0.5, 1, 2.5, 10]:
+            expected = np.flatnonzero(np.all(np.abs(index.Angles - np.sort(angles)) <= tolerance, axis = 1))
+            np.testing.assert_array_equal(index.Query_Angles(angles, tolerance), expected,
+                                          err_msg = '%s within %g' % (angles, tolerance))
+
+
+def test_query_sides(index):
+
+    a, b, c = index.Sides.T
+
+    for tolerance in [0, 1e-3, 0.01, 0.1, 0.5]:
+        np.testing.assert_array_equal(index.Query_Equilateral(tolerance), np.flatnonzero(1 - a/c <= tolerance))
+        np.testing.assert_array_equal(index.Query_Isosceles(tolerance),
+                                      np.flatnonzero(np.minimum(1 - a/b, 1 - b/c) <= tolerance))
@@ -0,0 +1,75 @@
+'''Checks that TriangleMesh.Move_Vertices keeps the computed centers equal to those
+    of a full Generate_Centers of the moved mesh.'''
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Geometry import CENTERS, TriangleMesh
+
+
+def Grid_Mesh(n = 12, seed = 0):
+    '''Return the Points and Faces of an n by n grid of jittered points, two faces per
+        grid square.'''
+
+    rng = np.random.default_rng(seed)
+
+    x, y = np.meshgrid(np.arange(n, dtype = float), np.arange(n, dtype = float))
+    Points = np.stack([x.ravel(), y.ravel()], axis = 1) + rng.uniform(-0.2, 0.2, (n*n, 2))
+
+    i, j = np.meshgrid(np.arange(n - 1), np.arange(n - 1))
+    corner = (j*n + i).ravel()
+    Faces = np.concatenate([np.stack([corner, corner + 1, corner + n + 1], axis = 1),
+                            np.stack([corner, corner + n + 1, corner + n], axis = 1)])
+
+    return Points, Faces
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_move_vertices(dtype):
+
+    Points, Faces = Grid_Mesh()
+    original = Points.copy()
+    rng = np.random.default_rng(1)
+
+    #Small chunks so the full computation spans several batches
+    mesh = TriangleMesh(Points, Faces, chunk_size = 50, dtype = dtype)
+    mesh.Generate_Centers()
+
+    for step in range(20):
+        vertices = rng.choice(len(Points), size = rng.integers(1, 6), replace = False)
+        positions = mesh.Points[vertices] + rng.uniform(-0.3, 0.3, (len(vertices), 2))
+
+        faces = mesh.Move_Vertices(vertices, positions)
+
+        assert np.array_equal(faces, np.flatnonzero(np.isin(Faces, vertices).any(axis = 1)))
+
+        expected = TriangleMesh(mesh.Points, Faces, chunk_size = 50, dtype = dtype).Generate_Centers()
+        for center in CENTERS:
+            assert mesh.Centers[center].dtype == dtype
+            np.testing.assert_array_equal(mesh.Centers[center], expected[center], err_msg = center)
+
+    #The caller's points are left alone
+    assert np.array_equal(Points, original)
+
+
+def test_move_vertices_kept_centers():
+
+    Points, Faces = Grid_Mesh(6)
+
+    mesh = TriangleMesh(Points, Faces)
+
+    #Nothing is kept before a computation, moving only changes the points
+    mesh.Move_Vertices([7], [[1.5, 1.5]])
+    assert mesh.Centers == {}
+
+    #Only the computed centers are kept up to date
+    mesh.Generate_Incenter()
+    mesh.Move_Vertices([8, 14], [[2.5, 1.5], [2.1, 2.2]])
+
+    assert list(mesh.Centers) == ['Incenter']
+    np.testing.assert_array_equal(mesh.Centers['Incenter'], TriangleMesh(mesh.Points, Faces).Generate_Incenter())
@@ -0,0 +1,73 @@
+'''Checks that the triangle server answers single and many-triangle requests, as JSON
+    and binary, with the metrics of Generate_Metrics.'''
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Geometry import METRIC_COLUMNS, Generate_Metrics
+from Triangle_Server import Create_Server, TriangleClient
+
+
+@pytest.fixture
+def client():
+
+    server = Create_Server(port = 0)
+    thread = threading.Thread(target = server.serve_forever, daemon = True)
+    thread.start()
+
+    client = TriangleClient(port = server.server_address[1])
+    yield client
+
+    client.Close()
+    server.shutdown()
+    server.server_close()
+    server.batcher.Stop()
+
+
+def Check(metrics, expected):
+
+    for column in METRIC_COLUMNS:
+        np.testing.assert_allclose(metrics[column], expected[column], rtol = 1e-12, atol = 1e-12, err_msg = column)
+
+
+def test_compute(client):
+
+    Vertices = np.random.default_rng(0).random((5, 3, 2))
+    expected = Generate_Metrics(Vertices)
+
+    for n, vertices in enumerate(Vertices):
+        metrics = client.Compute(*vertices)
+        Check(metrics, {column: expected[column][n] for column in METRIC_COLUMNS})
+
+
+def test_compute_many(client):
+
+    Vertices = np.random.default_rng(1).random((1000, 3, 2))
+    expected = Generate_Metrics(Vertices)
+
+    Check(client.Compute_Many(Vertices), expected)
+    Check(client._Request('POST', '/compute', {'triangles': Vertices.tolist()}), expected)
+    assert all(len(values) == 0 for values in client.Compute_Many(np.zeros((0, 3, 2))).values())
+
+    stats = client.Stats()
+    assert stats['requests'] == 3 and stats['triangles'] == 2000
+
+
+def test_bad_requests(client):
+
+    with pytest.raises(ValueError):
+        client._Request('POST', '/compute', {'triangles': [[0, 0], [1, 0]]})
+    with pytest.raises(ValueError):
+        client._Request('POST', '/compute', data = bytes(40))
+    with pytest.raises(ValueError):
+        client.Compute_Many(np.zeros((4, 2)))
+
+    #The connection is still usable
+    Check(client.Compute((0, 0), (1, 0), (0, 1)), {column: values[0] for column, values in
+                                                     Generate_Metrics(np.array([[[0, 0], [1, 0], [0, 1.]]])).items()})
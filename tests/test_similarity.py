@@ -0,0 +1,70 @@
+'''Checks that SimilarityCache maps the centers of a cached shape onto translated,
+    scaled, rotated, reflected and relabelled copies of a triangle.'''
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Geometry import CENTERS, Triangle, SimilarityCache
+
+
+def Base_Triangles(n = 50, seed = 0):
+    '''Return n random (3, 2) triangles whose smallest angle is over 10 degrees.'''
+
+    rng = np.random.default_rng(seed)
+
+    triangles = []
+    while len(triangles) < n:
+        V = rng.random((3, 2))
+        if min(Triangle(*V).Angles) > np.radians(10):
+            triangles.append(V)
+
+    return triangles
+
+
+def Copies(V, rng, n = 20):
+    '''Yield n copies of the triangle V, each rotated, possibly reflected, translated
+        and scaled, and with its vertices in a random order.'''
+
+    for k in range(n):
+        theta = rng.uniform(0, 2*np.pi)
+        rotation = np.array([[np.cos(theta), -np.sin(theta)], [np.sin(theta), np.cos(theta)]])
+        if k % 2:
+            rotation = rotation @ np.diag([-1.0, 1.0])
+
+        #Translations are relative to the size, far larger ones lose the shape to rounding
+        scale = 10**rng.uniform(-3, 3)
+        yield (V[rng.permutation(3)] @ rotation.T + rng.uniform(-100, 100, 2))*scale
+
+
+def test_similar_copies():
+
+    rng = np.random.default_rng(1)
+    cache = SimilarityCache()
+
+    for V in Base_Triangles():
+        for W in Copies(V, rng):
+            scale = np.ptp(W, axis = 0).max()
+            triangle = Triangle(*W)
+            centers = cache.Get_Centers(*W)
+
+            for center in CENTERS:
+                np.testing.assert_allclose(centers[center], getattr(triangle, 'Generate_' + center)(),
+                                           rtol = 0, atol = 1e-9*scale, err_msg = center)
+
+
+def test_similar_copies_share_entries():
+
+    rng = np.random.default_rng(2)
+    cache = SimilarityCache(decimals = 9)
+
+    bases = Base_Triangles(seed = 3)
+    for V in bases:
+        for W in Copies(V, rng):
+            cache.Get_Centers(*W)
+
+    assert cache.misses == len(bases) == len(cache)
+    assert cache.hits == 19*len(bases)
@@ -0,0 +1,70 @@
+'''Checks that importing Triangle_Viewer stays within a time budget and does not
+    import the modules that are deferred until they are needed.'''
+import os
+import sys
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#Import time in seconds of Triangle_Viewer excluding matplotlib (which also brings in
+#numpy), i.e. of the viewer and Geometry themselves, about 5 ms with warm bytecode.
+#It can be raised on slow machines with VIEWER_IMPORT_BUDGET.
+IMPORT_BUDGET = float(os.environ.get('VIEWER_IMPORT_BUDGET', 0.05))
+
+#Modules only imported for playback, exports and the disk cache, or an explicitly
+#selected backend
+DEFERRED = ['matplotlib.animation', 'numba', 'zipfile']
+
+#Modules Geometry defers when imported on its own
+GEOMETRY_DEFERRED = ['fractions', 'shutil', 'tempfile', 'zipfile', 'hashlib', 'numba']
+
+
+def Import_Times(module):
+    '''Return a list of (name, depth, cumulative seconds) of every module imported by
+        import module, from python -X importtime, in the order they finish. The import
+        is run once beforehand so that the times are for compiled bytecode.'''
+
+    with tempfile.TemporaryDirectory() as cache:
+        env = dict(os.environ, MPLBACKEND = 'Agg', PYTHONPYCACHEPREFIX = cache)
+        env.pop('GEOMETRY_BACKEND', None)
+        env.pop('PYTHONDONTWRITEBYTECODE', None)
+
+        command = [sys.executable, '-X', 'importtime', '-c', 'import ' + module]
+        subprocess.run(command, cwd = ROOT, env = env, capture_output = True, check = True)
+        process = subprocess.run(command, cwd = ROOT, env = env, capture_output = True, text = True, check = True)
+
+    times = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1)//2
+        times.append((name.strip(), depth, int(cumulative)/1e6))
+
+    return times
+
+
+def test_import_budget():
+
+    times = Import_Times('Triangle_Viewer')
+    total = [seconds for name, depth, seconds in times if name == 'Triangle_Viewer' and depth == 0][0]
+    #Direct imports of Triangle_Viewer that belong to matplotlib
+    matplotlib = sum(seconds for name, depth, seconds in times if depth == 1 and name.split('.')[0] == 'matplotlib')
+
+    assert total - matplotlib <= IMPORT_BUDGET, \
+        'importing Triangle_Viewer took %.3f s besides matplotlib, over the budget of %.3f s' % (total - matplotlib, IMPORT_BUDGET)
+
+
+def test_deferred_imports():
+
+    names = [name for name, depth, seconds in Import_Times('Triangle_Viewer')]
+
+    assert [name for name in DEFERRED if name in names] == []
+
+
+def test_geometry_deferred_imports():
+
+    names = [name for name, depth, seconds in Import_Times('Geometry')]
+
+    assert [name for name in GEOMETRY_DEFERRED if name in names] == []